@@ -44,7 +44,8 @@ async def list_firefox_profiles(username: str = "oscar"):
 @router.post("/auth/extract-cookies", response_model=ExtractCookiesResponse)
 async def extract_cookies(request: ExtractCookiesRequest):
     try:
-        result = cookie_service.extract_cookies(
+        result = await asyncio.to_thread(
+            cookie_service.extract_cookies,
             usuario=request.username,
             nombre_perfil=request.profile,
             output_path=request.output_path,
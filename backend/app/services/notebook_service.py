@@ -85,7 +85,10 @@ async def refresh_cookies_and_retry(operation_func, *args, **kwargs):
                 logger.info("Attempting to refresh cookies from Firefox...")
 
                 try:
-                    result = cookie_service.extract_cookies(
+                    # extract_cookies copia y lee SQLite de forma síncrona:
+                    # ejecutarlo en un hilo para no bloquear el event loop
+                    result = await asyncio.to_thread(
+                        cookie_service.extract_cookies,
                         usuario="oscar",
                         nombre_perfil=None,
                         output_path=str(settings.storage_state_path),
@@ -1,17 +1,26 @@
 """
 Módulo común con funciones y constantes compartidas entre los scripts de NotebookLM.
 
-Usado por: main.py, ver_cuaderno.py
+Usado por: main.py, ver_cuaderno.py, listar_cuadernos.py
 """
 
 import asyncio
-import tempfile
-from datetime import datetime
+import functools
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import unicodedata
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 
-from rich.console import Console
+from rich.console import Console, Group
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn
 from rich import box
 
 # Inicializar consola global
@@ -30,6 +39,176 @@ STUDIO_DATA_TABLE  = 9
 # Estado completado de artefacto
 ARTIFACT_STATUS_COMPLETED = 3
 
+# Cliente de NotebookLM abierto actualmente (uno por proceso), cuántos bloques
+# `async with cliente_compartido()` lo usan y el cerrojo (con su bucle) que protege ambos
+_cliente_compartido = None
+_usos_cliente = 0
+_cerrojo_cliente: tuple[asyncio.AbstractEventLoop, asyncio.Lock] | None = None
+
+
+def _cerrojo_del_bucle() -> asyncio.Lock:
+    """Devuelve el cerrojo del cliente compartido para el bucle de eventos actual.
+
+    Un asyncio.Lock queda ligado al bucle donde se usa: si el proceso ejecuta
+    varios asyncio.run() seguidos, cada bucle necesita el suyo.
+    """
+    global _cerrojo_cliente
+    bucle = asyncio.get_running_loop()
+    if _cerrojo_cliente is None or _cerrojo_cliente[0] is not bucle:
+        _cerrojo_cliente = (bucle, asyncio.Lock())
+    return _cerrojo_cliente[1]
+
+
+@asynccontextmanager
+async def cliente_compartido():
+    """Abre un único cliente de NotebookLM y lo reutiliza mientras siga abierto.
+
+    El cliente mantiene un pool de conexiones HTTP keep-alive, de modo que todas
+    las llamadas a la API (listados, generación, descargas) comparten conexión
+    en lugar de pagar un handshake TCP+TLS cada una. Si ya hay un cliente
+    abierto, se devuelve ese sin volver a autenticar.
+
+    Lleva la cuenta de los bloques que lo están usando (anidados o solapados,
+    p. ej. main() y ver_cuaderno en el mismo proceso): solo se cierra al salir
+    el último, así que ninguno se queda con un cliente cerrado entre manos.
+    """
+    global _cliente_compartido, _usos_cliente
+    cerrojo = _cerrojo_del_bucle()
+    async with cerrojo:
+        if _cliente_compartido is None:
+            client = await _crear_cliente()
+            await client.__aenter__()
+            _cliente_compartido = client
+        _usos_cliente += 1
+        client = _cliente_compartido
+
+    try:
+        yield client
+    finally:
+        async with cerrojo:
+            _usos_cliente -= 1
+            if _usos_cliente == 0:
+                _cliente_compartido = None
+                await client.__aexit__(None, None, None)
+
+
+# Tokens de sesión (CSRF y session id) cacheados en disco entre ejecuciones
+ARCHIVO_CACHE_TOKENS = 'tokens_sesion.json'
+TTL_CACHE_TOKENS = 3600.0
+
+
+def _guardar_tokens_sesion(huella: str, csrf_token: str, session_id: str):
+    """Guarda en disco (permisos 0600) los tokens de sesión asociados a la huella de las cookies."""
+    guardar_cache_disco(ARCHIVO_CACHE_TOKENS, {
+        'huella': huella,
+        'guardado': time.time(),
+        'csrf_token': csrf_token,
+        'session_id': session_id,
+    }, privado=True)
+
+
+async def _crear_cliente():
+    """Crea el cliente de NotebookLM reutilizando los tokens de la ejecución anterior.
+
+    NotebookLMClient.from_storage() descarga la página de NotebookLM en cada
+    arranque solo para extraer el token CSRF y el id de sesión. Se guardan en
+    disco (con permisos 0600) junto a una huella de las cookies, y mientras
+    las cookies no cambien y no pase TTL_CACHE_TOKENS se reutilizan. Si el
+    servidor los rechaza, el propio cliente los renueva (refresh_auth) y los
+    nuevos tokens sustituyen a los cacheados: así las siguientes ejecuciones
+    no vuelven a empezar con un RPC fallido.
+    """
+    from notebooklm import NotebookLMClient
+    from notebooklm.auth import AuthTokens, fetch_tokens, load_auth_from_storage
+
+    class ClienteConTokensCacheados(NotebookLMClient):
+        # El núcleo del SDK recibe self.refresh_auth como callback al construirse,
+        # así que sobrescribirlo aquí cubre también los reintentos automáticos
+        async def refresh_auth(self) -> AuthTokens:
+            auth = await super().refresh_auth()
+            debug("Tokens de sesión renovados por el servidor: actualizando la caché")
+            _guardar_tokens_sesion(huella, auth.csrf_token, auth.session_id)
+            return auth
+
+    cookies = load_auth_from_storage()
+    huella = hashlib.sha256(json.dumps(cookies, sort_keys=True).encode()).hexdigest()
+
+    cache = leer_cache_disco(ARCHIVO_CACHE_TOKENS)
+    if (cache.get('huella') == huella and cache.get('csrf_token') and cache.get('session_id')
+            and time.time() - cache.get('guardado', 0) < TTL_CACHE_TOKENS):
+        debug("Reutilizando tokens de sesión cacheados")
+        csrf_token, session_id = cache['csrf_token'], cache['session_id']
+    else:
+        csrf_token, session_id = await fetch_tokens(cookies)
+        _guardar_tokens_sesion(huella, csrf_token, session_id)
+
+    return ClienteConTokensCacheados(AuthTokens(cookies=cookies, csrf_token=csrf_token, session_id=session_id))
+
+
+# Errores esperables al recorrer la estructura raw (listas anidadas sin esquema)
+_ERRORES_ESTRUCTURA = (IndexError, TypeError, KeyError, AttributeError)
+
+
+def _url_por_mime(medios: list, mime: str) -> str | None:
+    """Devuelve la URL del medio con el mime indicado o, si no hay, la del primero."""
+    for item in medios:
+        if isinstance(item, list) and item[2:3] == [mime]:
+            return item[0]
+    # Fallback: primer item
+    primero = medios[0]
+    return primero[0] if isinstance(primero, list) and primero else None
+
+
+def _url_audio(artifact_raw: list) -> str | None:
+    # Audio: artifact[6][5] contiene lista de medios
+    medios = artifact_raw[6][5]
+    return _url_por_mime(medios, "audio/mp4") if isinstance(medios, list) else None
+
+
+def _url_video(artifact_raw: list) -> str | None:
+    # Video: artifact[8] contiene metadatos; la primera lista con URLs http son los medios
+    for item in artifact_raw[8]:
+        try:
+            es_lista_medios = isinstance(item, list) and item[0][0].startswith("http")
+        except _ERRORES_ESTRUCTURA:
+            continue
+        if es_lista_medios:
+            return _url_por_mime(item, "video/mp4")
+    return None
+
+
+def _url_imagen_infografia(item) -> str | None:
+    """URL de la imagen si `item` es el bloque de contenido de una infografía."""
+    try:
+        if isinstance(item[0], list):
+            img_data = item[2][0][1]
+            if isinstance(img_data, list) and img_data[0].startswith("http"):
+                return img_data[0]
+    except _ERRORES_ESTRUCTURA:
+        pass
+    return None
+
+
+def _url_infografia(artifact_raw: list) -> str | None:
+    # Infographic: el bloque no tiene posición fija (notebooklm-py también lo busca),
+    # se recorre al revés y se para en el primero que contiene una URL
+    return next(filter(None, map(_url_imagen_infografia, reversed(artifact_raw))), None)
+
+
+def _url_slides(artifact_raw: list) -> str | None:
+    # Slides: artifact[16][3] contiene URL del PDF
+    pdf_url = artifact_raw[16][3]
+    return pdf_url if isinstance(pdf_url, str) and pdf_url.startswith("http") else None
+
+
+# Extractor de URL de descarga por tipo de artefacto
+_EXTRACTORES_URL = {
+    STUDIO_AUDIO: _url_audio,
+    STUDIO_VIDEO: _url_video,
+    STUDIO_INFOGRAPHIC: _url_infografia,
+    STUDIO_SLIDE_DECK: _url_slides,
+}
+
 
 def extraer_url_de_artefacto_raw(artifact_raw: list, artifact_type: int) -> str | None:
     """Extrae la URL de descarga de un artefacto raw según su tipo.
@@ -43,82 +222,34 @@ def extraer_url_de_artefacto_raw(artifact_raw: list, artifact_type: int) -> str
     Returns:
         URL de descarga o None si no está disponible
     """
+    extractor = _EXTRACTORES_URL.get(artifact_type)
+    if extractor is None:
+        return None
     try:
-        if artifact_type == STUDIO_AUDIO:
-            # Audio: artifact[6][5] contiene lista de medios
-            if len(artifact_raw) <= 6:
-                return None
-            metadata = artifact_raw[6]
-            if not isinstance(metadata, list) or len(metadata) <= 5:
-                return None
-            media_list = metadata[5]
-            if not isinstance(media_list, list) or len(media_list) == 0:
-                return None
-            # Buscar audio/mp4
-            for item in media_list:
-                if isinstance(item, list) and len(item) > 2 and item[2] == "audio/mp4":
-                    return item[0]
-            # Fallback: primer item
-            if isinstance(media_list[0], list) and len(media_list[0]) > 0:
-                return media_list[0][0]
-
-        elif artifact_type == STUDIO_VIDEO:
-            # Video: artifact[8] contiene metadatos con URLs
-            if len(artifact_raw) <= 8:
-                return None
-            metadata = artifact_raw[8]
-            if not isinstance(metadata, list):
-                return None
-            # Buscar lista con URLs http
-            media_list = None
-            for item in metadata:
-                if (isinstance(item, list) and len(item) > 0 and
-                    isinstance(item[0], list) and len(item[0]) > 0 and
-                    isinstance(item[0][0], str) and item[0][0].startswith("http")):
-                    media_list = item
-                    break
-            if not media_list:
-                return None
-            # Buscar video/mp4
-            for item in media_list:
-                if isinstance(item, list) and len(item) > 2 and item[2] == "video/mp4":
-                    return item[0]
-            # Fallback
-            if isinstance(media_list[0], list) and len(media_list[0]) > 0:
-                return media_list[0][0]
-
-        elif artifact_type == STUDIO_INFOGRAPHIC:
-            # Infographic: buscar al revés en el artefacto
-            for item in reversed(artifact_raw):
-                if not isinstance(item, list) or len(item) == 0:
-                    continue
-                if not isinstance(item[0], list):
-                    continue
-                if len(item) <= 2 or not isinstance(item[2], list) or len(item[2]) == 0:
-                    continue
-                content_list = item[2]
-                if not isinstance(content_list[0], list) or len(content_list[0]) <= 1:
-                    continue
-                img_data = content_list[0][1]
-                if (isinstance(img_data, list) and len(img_data) > 0 and
-                    isinstance(img_data[0], str) and img_data[0].startswith("http")):
-                    return img_data[0]
-
-        elif artifact_type == STUDIO_SLIDE_DECK:
-            # Slides: artifact[16][3] contiene URL del PDF
-            if len(artifact_raw) <= 16:
-                return None
-            metadata = artifact_raw[16]
-            if not isinstance(metadata, list) or len(metadata) <= 3:
-                return None
-            pdf_url = metadata[3]
-            if isinstance(pdf_url, str) and pdf_url.startswith("http"):
-                return pdf_url
-
-    except (IndexError, TypeError):
-        pass
+        return extractor(artifact_raw)
+    except _ERRORES_ESTRUCTURA:
+        return None
 
-    return None
+
+def _urls_desde_raw(artifacts_raw: list) -> dict[str, tuple[str, int]]:
+    """Extrae {artifact_id: (url, artifact_type)} de los artefactos raw completados."""
+    urls = {}
+    for art in artifacts_raw:
+        # [id, título, tipo, ?, estado, ...]; descarta entradas que no son secuencias o son cortas
+        try:
+            artifact_id, _, artifact_type, _, artifact_status, *_ = art
+        except (TypeError, ValueError):
+            continue
+
+        # Solo procesar artefactos completados
+        if artifact_status != ARTIFACT_STATUS_COMPLETED:
+            continue
+
+        url = extraer_url_de_artefacto_raw(art, artifact_type)
+        if url:
+            # Guardar URL y tipo (el nombre se genera después con el título del Artifact)
+            urls[artifact_id] = (url, artifact_type)
+    return urls
 
 
 async def obtener_urls_artefactos(client, notebook_id: str) -> dict[str, tuple[str, int]]:
@@ -131,71 +262,53 @@ async def obtener_urls_artefactos(client, notebook_id: str) -> dict[str, tuple[s
     Returns:
         Diccionario {artifact_id: (url, artifact_type)}
     """
-    urls = {}
     try:
         # Obtener datos raw de artefactos
-        artifacts_raw = await client.artifacts._list_raw(notebook_id)
-
-        for art in artifacts_raw:
-            if not isinstance(art, list) or len(art) < 5:
-                continue
-
-            artifact_id = art[0]
-            artifact_type = art[2]
-            artifact_status = art[4]
-            artifact_title = art[1] if len(art) > 1 else ""
-
-            # Solo procesar artefactos completados
-            if artifact_status != ARTIFACT_STATUS_COMPLETED:
-                continue
-
-            url = extraer_url_de_artefacto_raw(art, artifact_type)
-            if url:
-                # Guardar URL y tipo (el nombre se genera después con el título del Artifact)
-                urls[artifact_id] = (url, artifact_type)
-
+        return _urls_desde_raw(await listar_artefactos_raw(client, notebook_id))
     except Exception as e:
-        debug(f"Error obteniendo URLs de artefactos: {e}")
+        debug("Error obteniendo URLs de artefactos: %s", e)
+        return {}
 
-    return urls
+
+# Extensión de archivo y subcomando de `notebooklm download` por tipo de artefacto (StudioContentType)
+_DESCARGA_POR_TIPO = {
+    STUDIO_AUDIO: (".mp4", "audio"),
+    STUDIO_VIDEO: (".mp4", "video"),
+    STUDIO_INFOGRAPHIC: (".png", "infographic"),
+    STUDIO_SLIDE_DECK: (".pdf", "slide-deck"),
+}
 
 
 def _extension_por_tipo(artifact_type: int) -> str:
     """Devuelve la extensión de archivo según el tipo de artefacto."""
-    extensiones = {
-        STUDIO_AUDIO: ".mp4",
-        STUDIO_VIDEO: ".mp4",
-        STUDIO_INFOGRAPHIC: ".png",
-        STUDIO_SLIDE_DECK: ".pdf",
-    }
-    return extensiones.get(artifact_type, "")
+    return _DESCARGA_POR_TIPO.get(artifact_type, ("", ""))[0]
 
 
 def _subcomando_por_tipo(artifact_type: int) -> str:
     """Devuelve el subcomando de notebooklm download según el tipo de artefacto."""
-    subcomandos = {
-        STUDIO_AUDIO: "audio",
-        STUDIO_VIDEO: "video",
-        STUDIO_INFOGRAPHIC: "infographic",
-        STUDIO_SLIDE_DECK: "slide-deck",
-    }
-    return subcomandos.get(artifact_type, "")
+    return _DESCARGA_POR_TIPO.get(artifact_type, ("", ""))[1]
 
 
+# Caracteres no válidos en nombres de archivo, más comas y espacios: todos se sustituyen por '_'
+_TABLA_NOMBRE_ARCHIVO = str.maketrans({c: '_' for c in '<>:"/\\|?*, '})
+
+
+@functools.lru_cache(maxsize=1024)
 def _limpiar_nombre_archivo(titulo: str) -> str:
     """Limpia un título para usarlo como nombre de archivo."""
     if not titulo:
         return ""
-    import re
-    import unicodedata
     # Normalizar acentos: convertir á->a, é->e, ñ->n, etc.
-    nombre = unicodedata.normalize('NFKD', titulo)
-    nombre = ''.join(c for c in nombre if not unicodedata.combining(c))
+    # Un título ASCII no tiene nada que normalizar. En el resto solo se quitan las
+    # marcas combinantes (no encode('ascii', 'ignore'), que borraría títulos en
+    # alfabetos no latinos como cirílico o japonés)
+    if titulo.isascii():
+        nombre = titulo
+    else:
+        nombre = unicodedata.normalize('NFKD', titulo)
+        nombre = ''.join(c for c in nombre if not unicodedata.combining(c))
     # Reemplazar caracteres no válidos, comas y espacios
-    nombre = re.sub(r'[<>:"/\\|?*]', '_', nombre)
-    nombre = nombre.replace(',', '_')
-    nombre = nombre.replace(' ', '_')
-    nombre = nombre.strip()
+    nombre = nombre.translate(_TABLA_NOMBRE_ARCHIVO).strip()
     # Limitar longitud
     if len(nombre) > 100:
         nombre = nombre[:100]
@@ -211,185 +324,524 @@ def set_debug(valor: bool):
     DEBUG = valor
 
 
+# Semáforo común a todas las llamadas a generar_artefactos (None = sin límite global)
+_semaforo_generaciones: asyncio.Semaphore | None = None
+
+
+def limitar_generaciones(maximo: int | None):
+    """Limita las generaciones de artefactos en curso a la vez en todo el proceso.
+
+    El límite es compartido por todos los cuadernos: al procesar varios vídeos
+    en lote no se multiplica por el número de vídeos.
+    """
+    global _semaforo_generaciones
+    _semaforo_generaciones = asyncio.Semaphore(maximo) if maximo else None
+
+
+# Último segundo formateado por timestamp(): [segundo_epoch, "HH:MM:SS"]
+_ultimo_timestamp = [0, '']
+
+
 def timestamp() -> str:
-    """Devuelve la hora actual formateada HH:MM:SS."""
-    return datetime.now().strftime("%H:%M:%S")
+    """Devuelve la hora actual formateada HH:MM:SS (se formatea una vez por segundo)."""
+    ahora = int(time.time())
+    if ahora != _ultimo_timestamp[0]:
+        _ultimo_timestamp[0] = ahora
+        _ultimo_timestamp[1] = time.strftime("%H:%M:%S", time.localtime(ahora))
+    return _ultimo_timestamp[1]
 
 
-def debug(mensaje: str):
-    """Imprime mensaje de debug si el modo está activo."""
+def debug(mensaje: str, *args):
+    """Imprime mensaje de debug si el modo está activo.
+
+    Acepta argumentos al estilo de logging (`debug("x=%s", x)`): el formateo
+    solo se hace si DEBUG está activo, así los sitios calientes no construyen
+    cadenas que nadie va a ver.
+    """
     if DEBUG:
+        if args:
+            mensaje = mensaje % args
         console.print(f"[dim yellow][DEBUG] {mensaje}[/dim yellow]")
 
 
-# Mapeo de tipos de artefactos (ordenados: sin límite primero, luego por tiempo)
-# Formato: (nombre_display, tiene_limite_diario)
+@dataclass(slots=True, frozen=True)
+class ArtefactoSpec:
+    """Metadatos fijos de un tipo de artefacto."""
+    nombre: str                       # Nombre para mostrar
+    tiene_limite: bool                # ¿Tiene límite diario de generación?
+    metodo_generacion: str            # Método de client.artifacts que lo genera
+    acepta_idioma: bool               # ¿El método acepta el parámetro language?
+    grupo_cuota: str | None = None    # Grupo de cuota compartida con otros tipos
+    es_sincrono: bool = False         # Devuelve el resultado directamente (sin GenerationStatus)
+    filtrar_por_idioma: bool = False  # Los existentes se filtran por idioma
+
+
+# Especificación de cada tipo de artefacto (ordenados: sin límite primero, luego por tiempo)
 # Sin límite: report, mind_map, data_table
-# Con límite: slides, infographic (comparten cuota), quiz, flashcards, audio, video
+# Con límite: slides, infographic (comparten cuota 'premium'), quiz, flashcards, audio, video
+# El método de generación se resuelve con getattr en cada llamada, así la tabla no depende del cliente
+ESPECIFICACIONES_ARTEFACTOS = {
+    'report': ArtefactoSpec('Informe', False, 'generate_report', True, filtrar_por_idioma=True),
+    'mind_map': ArtefactoSpec('Mapa Mental', False, 'generate_mind_map', False, es_sincrono=True),
+    'data_table': ArtefactoSpec('Tabla de Datos', False, 'generate_data_table', True),
+    'slides': ArtefactoSpec('Presentación (Slides)', True, 'generate_slide_deck', True, grupo_cuota='premium'),
+    'infographic': ArtefactoSpec('Infografía', True, 'generate_infographic', True, grupo_cuota='premium'),
+    'quiz': ArtefactoSpec('Cuestionario', True, 'generate_quiz', False),
+    'flashcards': ArtefactoSpec('Tarjetas Didácticas', True, 'generate_flashcards', False),
+    'audio': ArtefactoSpec('Resumen de Audio', True, 'generate_audio', True, filtrar_por_idioma=True),
+    'video': ArtefactoSpec('Video', True, 'generate_video', True),
+}
+
+# Mapeo de tipos de artefactos derivado de las especificaciones
+# Formato: (nombre_display, tiene_limite_diario)
 TIPOS_ARTEFACTOS = {
-    'report': ('Informe', False),
-    'mind_map': ('Mapa Mental', False),
-    'data_table': ('Tabla de Datos', False),
-    'slides': ('Presentación (Slides)', True),
-    'infographic': ('Infografía', True),
-    'quiz': ('Cuestionario', True),
-    'flashcards': ('Tarjetas Didácticas', True),
-    'audio': ('Resumen de Audio', True),
-    'video': ('Video', True),
+    tipo: (spec.nombre, spec.tiene_limite) for tipo, spec in ESPECIFICACIONES_ARTEFACTOS.items()
 }
 
+# Artifact.kind del SDK -> clave de tipo local (solo difieren las presentaciones)
+_TIPO_POR_KIND = {tipo: tipo for tipo in ESPECIFICACIONES_ARTEFACTOS} | {'slide_deck': 'slides'}
+
 # Lista ordenada de tipos (el orden importa para generación)
 # Sin límite primero, luego con límite (video último por ser el más lento)
 ORDEN_ARTEFACTOS = ['report', 'mind_map', 'data_table', 'slides', 'infographic', 'quiz', 'flashcards', 'audio', 'video']
 
 
+@functools.lru_cache(maxsize=64)
+def _idioma_coincide(lang: str, idioma_lower: str) -> bool:
+    """Decide si el código `lang` corresponde a `idioma_lower` (memoizado: hay pocos idiomas distintos)."""
+    return lang[:len(idioma_lower)].lower() == idioma_lower
+
+
+def crear_filtro_idioma(idioma: str):
+    """Devuelve un predicado `coincide(artefacto) -> bool` especializado para `idioma`.
+
+    El código de idioma se pasa a minúsculas una sola vez al crear el filtro,
+    no en cada artefacto.
+    """
+    idioma_lower = idioma.lower()
+
+    def coincide(artefacto) -> bool:
+        # Intentar obtener el idioma del artefacto
+        lang = getattr(artefacto, 'language', None)
+        if lang:
+            if DEBUG:
+                debug("      Artefacto tiene language=%s, buscando=%s", lang, idioma_lower)
+            return _idioma_coincide(lang, idioma_lower)
+
+        # Si no hay atributo language, intentar detectar por título
+        if DEBUG:
+            title = getattr(artefacto, 'title', '') or ''
+            debug("      Artefacto sin language, título=%s", title)
+
+        # Heurística: algunos títulos incluyen indicadores de idioma
+        # Por ahora, si no podemos determinar el idioma, asumimos que coincide
+        return True
+
+    return coincide
+
+
 def artefacto_tiene_idioma(artefacto, idioma: str) -> bool:
-    """Verifica si un artefacto está en el idioma especificado."""
-    # Intentar obtener el idioma del artefacto
-    lang = getattr(artefacto, 'language', None)
-    if lang:
-        debug(f"      Artefacto tiene language={lang}, buscando={idioma}")
-        return lang.lower().startswith(idioma.lower())
+    """Verifica si un artefacto está en el idioma especificado.
 
-    # Si no hay atributo language, intentar detectar por título
-    title = getattr(artefacto, 'title', '') or ''
-    debug(f"      Artefacto sin language, título={title}")
+    Para filtrar muchos artefactos, usar crear_filtro_idioma(idioma) una vez.
+    """
+    return crear_filtro_idioma(idioma)(artefacto)
 
-    # Heurística: algunos títulos incluyen indicadores de idioma
-    # Por ahora, si no podemos determinar el idioma, asumimos que coincide
-    return True
 
+@dataclass(slots=True)
+class ArtefactosExistentes:
+    """Artefactos ya presentes en un cuaderno, agrupados por tipo.
 
-async def verificar_artefactos_existentes(client, notebook_id: str, idioma: str = 'es') -> tuple[dict, dict]:
-    """Verifica qué artefactos ya existen en el cuaderno en el idioma especificado.
+    Los nombres de campo coinciden con las claves de TIPOS_ARTEFACTOS,
+    de modo que `getattr(existentes, tipo)` devuelve la lista de ese tipo.
+    """
+    report: list = field(default_factory=list)
+    mind_map: list = field(default_factory=list)
+    data_table: list = field(default_factory=list)
+    slides: list = field(default_factory=list)
+    infographic: list = field(default_factory=list)
+    quiz: list = field(default_factory=list)
+    flashcards: list = field(default_factory=list)
+    audio: list = field(default_factory=list)
+    video: list = field(default_factory=list)
+
+    def resumen(self) -> str:
+        """Devuelve 'tipo=N, ...' para los mensajes de debug."""
+        return ", ".join(f"{f.name}={len(getattr(self, f.name))}" for f in fields(self))
+
+
+@contextmanager
+def _en_vivo(pantalla):
+    """Muestra una pantalla en vivo de rich (spinner o barra de progreso) durante el bloque.
+
+    rich solo admite una pantalla en vivo a la vez: si ya hay otra activa (varios
+    vídeos procesándose en paralelo), el bloque se ejecuta sin mostrarla.
+    """
+    from rich.errors import LiveError
+    if _salida_tarea.get() is not None:
+        # Con la salida acumulada en un búfer, un spinner o una barra no aportan nada
+        yield pantalla
+        return
+    try:
+        pantalla.start()
+    except LiveError:
+        yield pantalla
+        return
+    try:
+        yield pantalla
+    finally:
+        pantalla.stop()
 
-    Returns:
-        Tupla (existentes, urls) donde:
-        - existentes: dict con listas de artefactos por tipo
-        - urls: dict {artifact_id: url} con URLs de descarga
+
+def estado_consola(mensaje: str, **kwargs):
+    """Como console.status, pero sin fallar si ya hay otra pantalla en vivo."""
+    return _en_vivo(console.status(mensaje, **kwargs))
+
+
+# Búfer de salida de la tarea asyncio actual (None = escribir directamente)
+_salida_tarea: ContextVar[io.StringIO | None] = ContextVar('_salida_tarea', default=None)
+
+
+class _SalidaPorTarea:
+    """Sustituto de sys.stdout que escribe en el búfer de la tarea actual, si lo tiene.
+
+    Tanto print() como la consola de rich escriben en sys.stdout, así que basta
+    con este objeto para agrupar toda la salida de una tarea sin tocar cada llamada.
     """
-    debug(f"Verificando artefactos en notebook: {notebook_id} (idioma: {idioma})")
-    existentes = {
-        'report': [],
-        'mind_map': [],
-        'data_table': [],
-        'slides': [],
-        'infographic': [],
-        'quiz': [],
-        'flashcards': [],
-        'audio': [],
-        'video': [],
-    }
-    urls = {}
 
+    def __init__(self, real):
+        self._real = real
+
+    def write(self, texto: str) -> int:
+        return (_salida_tarea.get() or self._real).write(texto)
+
+    def flush(self):
+        if _salida_tarea.get() is None:
+            self._real.flush()
+
+    def __getattr__(self, nombre):
+        return getattr(self._real, nombre)
+
+
+@contextmanager
+def salida_agrupada():
+    """Permite que cada tarea acumule su salida con salida_de_tarea() durante el bloque."""
+    real = sys.stdout
+    sys.stdout = _SalidaPorTarea(real)
     try:
-        # Listar cada tipo de artefacto (con spinner visual si no hay barra de progreso externa)
-        with console.status(f"[bold green]Verificando artefactos existentes ({idioma})...", spinner="dots"):
-            debug("  Buscando reports...")
-            try:
-                reports = await client.artifacts.list_reports(notebook_id)
-                debug(f"    Reports encontrados: {len(reports) if reports else 0}")
-                if reports:
-                    for report in reports:
-                        if artefacto_tiene_idioma(report, idioma):
-                            existentes['report'].append(report)
-            except Exception as e:
-                debug(f"    Error listando reports: {e}")
+        yield
+    finally:
+        sys.stdout = real
 
-            debug("  Buscando audios...")
-            try:
-                audios = await client.artifacts.list_audio(notebook_id)
-                debug(f"    Audios encontrados: {len(audios) if audios else 0}")
-                if audios:
-                    for audio in audios:
-                        if artefacto_tiene_idioma(audio, idioma):
-                            existentes['audio'].append(audio)
-            except Exception as e:
-                debug(f"    Error listando audios: {e}")
 
-            debug("  Buscando slides...")
-            try:
-                slides = await client.artifacts.list_slide_decks(notebook_id)
-                debug(f"    Slides encontrados: {len(slides) if slides else 0}")
-                if slides:
-                    existentes['slides'] = list(slides)
-            except Exception as e:
-                debug(f"    Error listando slides: {e}")
+@contextmanager
+def salida_de_tarea():
+    """Acumula la salida de la tarea actual y la escribe de una vez al terminar.
 
-            debug("  Buscando infographics...")
-            try:
-                infographics = await client.artifacts.list_infographics(notebook_id)
-                debug(f"    Infographics encontrados: {len(infographics) if infographics else 0}")
-                if infographics:
-                    existentes['infographic'] = list(infographics)
-            except Exception as e:
-                debug(f"    Error listando infographics: {e}")
+    Con varios vídeos en paralelo, así el informe de cada uno sale seguido en
+    lugar de entremezclado línea a línea con los demás. Solo tiene efecto dentro
+    de salida_agrupada().
+    """
+    if not isinstance(sys.stdout, _SalidaPorTarea):
+        yield
+        return
+    bufer = io.StringIO()
+    marca = _salida_tarea.set(bufer)
+    try:
+        yield
+    finally:
+        _salida_tarea.reset(marca)
+        sys.stdout.write(bufer.getvalue())
+        sys.stdout.flush()
 
-            debug("  Buscando videos...")
-            try:
-                videos = await client.artifacts.list_video(notebook_id)
-                debug(f"    Videos encontrados: {len(videos) if videos else 0}")
-                if videos:
-                    existentes['video'] = list(videos)
-            except Exception as e:
-                debug(f"    Error listando videos: {e}")
 
-            debug("  Buscando mind_maps...")
-            try:
-                # Mind maps usan el método list() con tipo 5
-                mind_maps = await client.artifacts.list(notebook_id, 5)
-                debug(f"    Mind maps encontrados: {len(mind_maps) if mind_maps else 0}")
-                if mind_maps:
-                    existentes['mind_map'] = list(mind_maps)
-            except Exception as e:
-                debug(f"    Error listando mind_maps: {e}")
+def _crear_progreso():
+    """Crea la barra de progreso de generación sobre la consola compartida.
 
-            debug("  Buscando data_tables...")
-            try:
-                data_tables = await client.artifacts.list_data_tables(notebook_id)
-                debug(f"    Data tables encontrados: {len(data_tables) if data_tables else 0}")
-                if data_tables:
-                    existentes['data_table'] = list(data_tables)
-            except Exception as e:
-                debug(f"    Error listando data_tables: {e}")
+    rich.progress solo se importa aquí: listar o ver cuadernos sin generar
+    nada no paga su carga. No se reutiliza una única instancia porque las
+    tareas de una generación anterior quedarían en pantalla.
+    """
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        TimeElapsedColumn(),
+        console=console
+    )
 
-            debug("  Buscando quizzes...")
-            try:
-                quizzes = await client.artifacts.list_quizzes(notebook_id)
-                debug(f"    Quizzes encontrados: {len(quizzes) if quizzes else 0}")
-                if quizzes:
-                    existentes['quiz'] = list(quizzes)
-            except Exception as e:
-                debug(f"    Error listando quizzes: {e}")
 
-            debug("  Buscando flashcards...")
-            try:
-                flashcards = await client.artifacts.list_flashcards(notebook_id)
-                debug(f"    Flashcards encontrados: {len(flashcards) if flashcards else 0}")
-                if flashcards:
-                    existentes['flashcards'] = list(flashcards)
-            except Exception as e:
-                debug(f"    Error listando flashcards: {e}")
+# Caché en disco (persiste entre ejecuciones): un archivo JSON por uso
+DIRECTORIO_CACHE = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'notebooklm-yt'
 
-    except Exception as e:
-        console.print(f"[bold red]⚠ Error al verificar artefactos: {e}[/bold red]")
-        debug(f"  Excepción general: {e}")
 
-    # Obtener URLs de descarga
-    debug("  Obteniendo URLs de descarga...")
+def leer_cache_disco(nombre: str) -> dict:
+    """Lee un archivo de caché JSON de DIRECTORIO_CACHE; {} si no existe o está dañado."""
+    try:
+        with open(DIRECTORIO_CACHE / nombre, encoding='utf-8') as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return datos if isinstance(datos, dict) else {}
+
+
+def guardar_cache_disco(nombre: str, datos: dict, privado: bool = False):
+    """Guarda un archivo de caché JSON escribiendo aparte y renombrando (atómico).
+
+    Con privado=True el archivo se crea con permisos 0600 (solo el dueño).
+    """
+    try:
+        DIRECTORIO_CACHE.mkdir(parents=True, exist_ok=True)
+        temporal = DIRECTORIO_CACHE / f"{nombre}.tmp"
+        temporal.unlink(missing_ok=True)
+        opener = (lambda ruta, flags: os.open(ruta, flags, 0o600)) if privado else None
+        with open(temporal, 'w', encoding='utf-8', opener=opener) as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, DIRECTORIO_CACHE / nombre)
+    except OSError as e:
+        debug("No se pudo guardar la caché %s: %s", nombre, e)
+
+
+# Caché en memoria de verificar_artefactos_existentes: (notebook_id, idioma) -> (instante, resultado)
+TTL_CACHE_ARTEFACTOS = 30.0
+_cache_artefactos: dict[tuple[str, str], tuple[float, tuple]] = {}
+
+
+# Listados raw recientes: (id del cliente, notebook_id) -> (instante, futuro del listado)
+TTL_LISTADO_RAW = 5.0
+_listados_raw: dict[tuple[int, str], tuple[float, asyncio.Future]] = {}
+
+
+def invalidar_cache_artefactos(notebook_id: str):
+    """Descarta las entradas cacheadas de un cuaderno (p. ej. tras generar artefactos)."""
+    for clave in [c for c in _cache_artefactos if c[0] == notebook_id]:
+        del _cache_artefactos[clave]
+    for clave in [c for c in _listados_raw if c[1] == notebook_id]:
+        del _listados_raw[clave]
+
+
+async def listar_artefactos_raw(client, notebook_id: str) -> list:
+    """Devuelve client.artifacts._list_raw(notebook_id) compartiendo peticiones cercanas.
+
+    Quien pida el mismo listado mientras está en vuelo o en los TTL_LISTADO_RAW
+    segundos siguientes recibe el mismo resultado sin repetir el RPC (p. ej.
+    verificar los artefactos y justo después mostrar el informe). Si falla, no
+    se guarda: la siguiente llamada lo vuelve a pedir.
+    """
+    clave = (id(client), notebook_id)
+    entrada = _listados_raw.get(clave)
+    if entrada is None or time.monotonic() - entrada[0] >= TTL_LISTADO_RAW:
+        futuro = asyncio.ensure_future(client.artifacts._list_raw(notebook_id))
+        entrada = _listados_raw[clave] = (time.monotonic(), futuro)
+
+        def descartar_si_falla(f, entrada=entrada):
+            if (f.cancelled() or f.exception() is not None) and _listados_raw.get(clave) is entrada:
+                del _listados_raw[clave]
+
+        futuro.add_done_callback(descartar_si_falla)
+    else:
+        debug("Reutilizando el listado de artefactos de %s", notebook_id)
+    # shield: cancelar a quien espera no debe cancelar el listado que comparten otros
+    return await asyncio.shield(entrada[1])
+
+
+async def verificar_artefactos_existentes(client, notebook_id: str, idioma: str = 'es') -> tuple[ArtefactosExistentes, dict]:
+    """Verifica qué artefactos ya existen en el cuaderno en el idioma especificado.
+
+    El resultado se cachea TTL_CACHE_ARTEFACTOS segundos por (notebook_id, idioma);
+    generar_artefactos invalida la caché del cuaderno al terminar.
+
+    Returns:
+        Tupla (existentes, urls) donde:
+        - existentes: ArtefactosExistentes con listas de artefactos por tipo
+        - urls: dict {artifact_id: url} con URLs de descarga
+    """
+    clave = (notebook_id, idioma)
+    cacheado = _cache_artefactos.get(clave)
+    if cacheado and time.monotonic() - cacheado[0] < TTL_CACHE_ARTEFACTOS:
+        debug("Usando artefactos cacheados de %s (idioma: %s)", notebook_id, idioma)
+        return cacheado[1]
+
+    debug("Verificando artefactos en notebook: %s (idioma: %s)", notebook_id, idioma)
+    existentes = ArtefactosExistentes()
+    urls = {}
+    hubo_errores = False
+
     try:
-        urls = await obtener_urls_artefactos(client, notebook_id)
-        debug(f"    URLs encontradas: {len(urls)}")
+        from notebooklm import Artifact
+
+        # Todos los list_* del SDK hacen la misma RPC (LIST_ARTIFACTS) y filtran por tipo:
+        # basta con pedir el listado raw una vez y clasificarlo aquí, que además
+        # trae las URLs de descarga. Los mapas mentales viven en el sistema de notas.
+        debug("  Listando artefactos (raw) y mapas mentales en paralelo...")
+        with estado_consola(f"[bold green]Verificando artefactos existentes ({idioma})...",
+                            spinner="dots", refresh_per_second=4):
+            resultado_raw, resultado_mapas = await asyncio.gather(
+                listar_artefactos_raw(client, notebook_id),
+                client.notes.list_mind_maps(notebook_id),
+                return_exceptions=True,
+            )
+
+        coincide_idioma = crear_filtro_idioma(idioma)
+
+        if isinstance(resultado_raw, Exception):
+            debug("    Error listando artefactos: %s", resultado_raw)
+            hubo_errores = True
+        else:
+            urls = _urls_desde_raw(resultado_raw)
+            debug("    URLs encontradas: %d", len(urls))
+            for art_raw in resultado_raw:
+                if not isinstance(art_raw, list) or not art_raw:
+                    continue
+                artefacto = Artifact.from_api_response(art_raw)
+                tipo = _TIPO_POR_KIND.get(artefacto.kind.value)
+                if tipo is None:
+                    continue
+                if ESPECIFICACIONES_ARTEFACTOS[tipo].filtrar_por_idioma and not coincide_idioma(artefacto):
+                    continue
+                getattr(existentes, tipo).append(artefacto)
+
+        if isinstance(resultado_mapas, Exception):
+            debug("    Error listando mind_maps: %s", resultado_mapas)
+            hubo_errores = True
+        else:
+            for datos in resultado_mapas:
+                mapa = Artifact.from_mind_map(datos)
+                if mapa is not None:  # None = mapa borrado
+                    existentes.mind_map.append(mapa)
+
     except Exception as e:
-        debug(f"    Error obteniendo URLs: {e}")
+        console.print(f"[bold red]⚠ Error al verificar artefactos: {e}[/bold red]")
+        debug("  Excepción general: %s", e)
+        hubo_errores = True
 
-    resumen = ", ".join(f"{k}={len(v)}" for k, v in existentes.items())
-    debug(f"Resumen artefactos: {resumen}")
+    if DEBUG:
+        debug(f"Resumen artefactos: {existentes.resumen()}")
+    # No cachear resultados parciales: la siguiente llamada debe reintentar
+    if not hubo_errores:
+        _cache_artefactos[clave] = (time.monotonic(), (existentes, urls))
     return existentes, urls
 
 
-async def generar_artefactos(client, notebook_id: str, faltantes: list[str], idioma: str = 'es', retardo_entre_tareas: float = 3.0) -> int:
-    """Genera los artefactos especificados en paralelo con retardo escalonado.
+class SondeoEstados:
+    """Sondeo compartido del estado de las generaciones en curso de un cuaderno.
+
+    El SDK no tiene RPC para consultar una sola tarea: poll_status lista todos
+    los artefactos y busca uno. Con varias generaciones en curso, un único
+    listado por ronda sirve a todas en lugar de uno por tarea. Las rondas se
+    espacian con backoff exponencial y jitter (los artefactos lentos tardan
+    minutos) y vuelven al intervalo inicial cuando llega una tarea nueva.
+    """
+
+    def __init__(self, client, notebook_id: str, intervalo_inicial: float = 2.0,
+                 intervalo_maximo: float = 15.0):
+        self._client = client
+        self._notebook_id = notebook_id
+        self._intervalo_inicial = intervalo_inicial
+        self._intervalo_maximo = intervalo_maximo
+        self._intervalo = intervalo_inicial
+        self._pendientes: dict[str, asyncio.Future] = {}
+        self._bucle: asyncio.Task | None = None
+
+    async def esperar(self, task_id: str, timeout: float = 1800.0):
+        """Espera a que termine la tarea de generación `task_id`.
+
+        Returns:
+            GenerationStatus final (completed o failed).
+
+        Raises:
+            TimeoutError: Si la tarea no termina dentro de `timeout` segundos.
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes[task_id] = futuro
+        self._intervalo = self._intervalo_inicial
+        if self._bucle is None or self._bucle.done():
+            self._bucle = asyncio.create_task(self._sondear())
+        try:
+            return await asyncio.wait_for(futuro, timeout)
+        except TimeoutError:
+            raise TimeoutError(f"La tarea {task_id} no terminó en {timeout:.0f}s") from None
+        finally:
+            self._pendientes.pop(task_id, None)
+
+    def _hay_pendientes(self) -> bool:
+        return any(not futuro.done() for futuro in self._pendientes.values())
+
+    async def _sondear(self):
+        """Lista los artefactos por rondas y resuelve las tareas que han terminado."""
+        from notebooklm import GenerationStatus
+        from notebooklm.rpc import ArtifactStatus, artifact_status_to_str
+
+        artifacts = self._client.artifacts
+        while self._hay_pendientes():
+            try:
+                artefactos_raw = await artifacts._list_raw(self._notebook_id)
+            except Exception as e:
+                # Sin listado no se conoce el estado de ninguna tarea: avisar a todas
+                for futuro in self._pendientes.values():
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                return
+
+            for art in artefactos_raw:
+                if not isinstance(art, list) or not art:
+                    continue
+                futuro = self._pendientes.get(art[0])
+                if futuro is None or futuro.done():
+                    continue
+                codigo = art[4] if len(art) > 4 else 0
+                # Como poll_status: un medio "completado" sin URL todavía sigue en proceso
+                if codigo == ArtifactStatus.COMPLETED and not artifacts._is_media_ready(art, art[2] if len(art) > 2 else 0):
+                    codigo = ArtifactStatus.PROCESSING
+                estado = artifact_status_to_str(codigo)
+                if estado in ('completed', 'failed'):
+                    futuro.set_result(GenerationStatus(task_id=art[0], status=estado))
+
+            if not self._hay_pendientes():
+                return
+            debug("  Sondeo de %s: %d tarea(s) en curso, siguiente en %.1fs",
+                  self._notebook_id, len(self._pendientes), self._intervalo)
+            await asyncio.sleep(self._intervalo + random.uniform(0, 0.5))
+            self._intervalo = min(self._intervalo * 1.7, self._intervalo_maximo)
+
+
+async def con_reintentos(funcion, *args, intentos: int = 5, espera_inicial: float = 0.5,
+                         espera_maxima: float = 8.0, errores: tuple = None, **kwargs):
+    """Devuelve `await funcion(*args, **kwargs)` reintentando los errores transitorios.
+
+    Por defecto reintenta límites de tasa (RateLimitError, HTTP 429) y errores
+    del servidor (ServerError, 5xx) con backoff exponencial y jitter; si el
+    servidor indica retry_after, se espera lo que pide, pero nunca más de
+    espera_maxima: un valor enorme o erróneo no debe bloquear la tarea (que
+    puede estar ocupando una plaza de un semáforo). Así se puede subir la
+    concurrencia sin que un pico de 429 aborte toda la ejecución.
+
+    Raises:
+        El último error si fallan los `intentos` intentos.
+    """
+    if errores is None:
+        from notebooklm.exceptions import RateLimitError, ServerError
+        errores = (RateLimitError, ServerError)
+
+    espera = espera_inicial
+    for intento in range(1, intentos + 1):
+        try:
+            return await funcion(*args, **kwargs)
+        except errores as e:
+            if intento == intentos:
+                raise
+            pausa = getattr(e, 'retry_after', None) or espera + random.uniform(0, espera)
+            pausa = min(pausa, espera_maxima)
+            debug("  %s (intento %d/%d), reintentando en %.1fs", type(e).__name__, intento, intentos, pausa)
+            await asyncio.sleep(pausa)
+            espera = min(espera * 2, espera_maxima)
+
+
+async def generar_artefactos(client, notebook_id: str, faltantes: list[str], idioma: str = 'es', retardo_entre_tareas: float = 3.0,
+                             max_concurrentes: int | None = None) -> int:
+    """Genera los artefactos especificados en paralelo con arranque escalonado.
     
     Args:
         client: Cliente de NotebookLM
@@ -397,144 +849,201 @@ async def generar_artefactos(client, notebook_id: str, faltantes: list[str], idi
         faltantes: Lista de tipos de artefactos a generar
         idioma: Código de idioma para los artefactos
         retardo_entre_tareas: Segundos de retardo entre el inicio de cada tarea
+        max_concurrentes: Máximo de generaciones en curso a la vez en esta llamada
+            (None = el límite global de limitar_generaciones(), si lo hay)
         
     Returns:
         Cantidad de artefactos generados exitosamente.
     """
-    debug(f"Generando artefactos faltantes: {faltantes} (idioma: {idioma}, retardo: {retardo_entre_tareas}s)")
+    if DEBUG:
+        debug(f"Generando artefactos faltantes: {faltantes} (idioma: {idioma}, retardo: {retardo_entre_tareas}s)")
+    from notebooklm.exceptions import RateLimitError
 
     if not faltantes:
         debug("No hay artefactos faltantes, retornando 0")
         return 0
 
-    # Configuración de artefactos y cuotas
-    # slides e infographic comparten cuota 'premium'
-    CUOTA_COMPARTIDA = {
-        'slides': 'premium', 'infographic': 'premium',
-    }
-    # Artefactos que no devuelven GenerationStatus (no usan wait_for_completion)
-    ARTEFACTOS_SINCRONOS = {'mind_map'}
-
-    CONFIG_ARTEFACTOS = {
-        'report': ('Informe', client.artifacts.generate_report, {'language': idioma}),
-        'mind_map': ('Mapa Mental', client.artifacts.generate_mind_map, {}),  # No acepta language
-        'data_table': ('Tabla de Datos', client.artifacts.generate_data_table, {'language': idioma}),
-        'slides': ('Presentación (Slides)', client.artifacts.generate_slide_deck, {'language': idioma}),
-        'infographic': ('Infografía', client.artifacts.generate_infographic, {'language': idioma}),
-        'quiz': ('Cuestionario', client.artifacts.generate_quiz, {}),  # No acepta language
-        'flashcards': ('Tarjetas Didácticas', client.artifacts.generate_flashcards, {}),  # No acepta language
-        'audio': ('Resumen de Audio', client.artifacts.generate_audio, {'language': idioma}),
-        'video': ('Video', client.artifacts.generate_video, {'language': idioma}),
+    # Un evento por grupo de cuota: se activa cuando un artefacto del grupo alcanza el límite
+    cuotas_agotadas = {
+        spec.grupo_cuota: asyncio.Event()
+        for spec in ESPECIFICACIONES_ARTEFACTOS.values() if spec.grupo_cuota
     }
 
-    exitosos = 0
-    cuotas_agotadas = set()
-    
+    # Limita las generaciones simultáneas para no saturar NotebookLM
+    if max_concurrentes:
+        semaforo = asyncio.Semaphore(max_concurrentes)
+    else:
+        semaforo = _semaforo_generaciones or asyncio.Semaphore(len(faltantes))
+    # Un único sondeo de estados para todas las generaciones del cuaderno
+    sondeo = SondeoEstados(client, notebook_id)
+
     console.print(f"\n[bold cyan]Iniciando generación de {len(faltantes)} artefactos...[/bold cyan]")
-    
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        TimeElapsedColumn(),
-        console=console
-    ) as progress:
-        
+
+    with _en_vivo(_crear_progreso()) as progress:
+
         task_total = progress.add_task("[bold]Progreso General", total=len(faltantes))
-        
-        for i, tipo in enumerate(faltantes):
-            nombre_display, generar_func, kwargs = CONFIG_ARTEFACTOS[tipo]
-            grupo_cuota = CUOTA_COMPARTIDA.get(tipo)
-            
-            # Verificar cuota compartida antes de empezar
-            if grupo_cuota and grupo_cuota in cuotas_agotadas:
+
+        async def generar_y_reportar(i: int, tipo: str) -> bool:
+            """Genera un artefacto tras su retardo escalonado y con plaza libre en el semáforo."""
+            # Arranque escalonado: la tarea i empieza i * retardo segundos después de la primera
+            await asyncio.sleep(i * retardo_entre_tareas)
+            async with semaforo:
+                return await generar_artefacto(tipo)
+
+        async def generar_artefacto(tipo: str) -> bool:
+            """Genera un artefacto y reporta el resultado. Devuelve True si se completó."""
+            spec = ESPECIFICACIONES_ARTEFACTOS[tipo]
+            nombre_display = spec.nombre
+            generar_func = getattr(client.artifacts, spec.metodo_generacion)
+            grupo_cuota = spec.grupo_cuota
+            evento_cuota = cuotas_agotadas.get(grupo_cuota)
+
+            # Verificar cuota compartida antes de empezar (puede haberse agotado
+            # mientras la tarea esperaba plaza en el semáforo)
+            if evento_cuota and evento_cuota.is_set():
                 console.print(f"[yellow]⏭ {nombre_display}: Omitido (cuota '{grupo_cuota}' agotada)[/yellow]")
                 progress.advance(task_total)
-                continue
-
-            # Retardo entre tareas
-            if i > 0:
-                task_wait = progress.add_task(f"[dim]Esperando {retardo_entre_tareas}s...", total=retardo_entre_tareas)
-                # Simular espera visual
-                for _ in range(int(retardo_entre_tareas * 10)):
-                    await asyncio.sleep(0.1)
-                    progress.update(task_wait, advance=0.1)
-                progress.update(task_wait, visible=False) # Ocultar espera al terminar
-
-            # Tarea actual
+                return False
+
             task_current = progress.add_task(f"Generando {nombre_display}...", total=None) # Indeterminado
-            
+            exito = False
+
             try:
-                debug(f"  Iniciando {nombre_display}")
-                resultado = await generar_func(notebook_id, **kwargs)
+                debug("  Iniciando %s", nombre_display)
+                # Un 429 transitorio se reintenta con backoff; otros errores no, porque
+                # el servidor podría haber empezado ya la generación y se duplicaría
+                opciones = {'language': idioma} if spec.acepta_idioma else {}
+                peticion = con_reintentos(generar_func, notebook_id, intentos=3,
+                                          errores=(RateLimitError,), **opciones)
+                if evento_cuota:
+                    # Si otro artefacto del grupo agota la cuota mientras esta petición
+                    # está en vuelo, abandonarla en vez de esperar un rechazo seguro
+                    tarea_generar = asyncio.create_task(peticion)
+                    tarea_cuota = asyncio.create_task(evento_cuota.wait())
+                    try:
+                        await asyncio.wait({tarea_generar, tarea_cuota}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        generada = tarea_generar.done()
+                        for tarea in (tarea_generar, tarea_cuota):
+                            if not tarea.done():
+                                tarea.cancel()
+                    if not generada:
+                        console.print(f"[yellow]⏭ {nombre_display}: Cancelado (cuota '{grupo_cuota}' agotada)[/yellow]")
+                        return False
+                    resultado = tarea_generar.result()
+                else:
+                    resultado = await peticion
 
                 # Artefactos síncronos (mind_map) devuelven dict, no GenerationStatus
-                if tipo in ARTEFACTOS_SINCRONOS:
+                if spec.es_sincrono:
                     if resultado and resultado.get('mind_map'):
                         console.print(f"[bold green]✓ Completado: {nombre_display}[/bold green]")
-                        exitosos += 1
+                        exito = True
                     else:
                         console.print(f"[red]✗ Error en {nombre_display}: No se pudo generar[/red]")
-                    progress.update(task_current, completed=100, visible=False)
-                    progress.advance(task_total)
-                    continue
+                    return exito
+
+                # Leer una sola vez los campos del GenerationStatus
+                estado_inicial = getattr(resultado, 'status', None)
+                task_id = getattr(resultado, 'task_id', None)
 
                 # Check inmediato de error/cuota para artefactos asíncronos
-                if resultado and getattr(resultado, 'status', None) == 'failed':
-                    if hasattr(resultado, 'is_rate_limited') and resultado.is_rate_limited:
+                if estado_inicial == 'failed':
+                    if getattr(resultado, 'is_rate_limited', False):
                         console.print(f"[bold red]⚠ {nombre_display}: Límite diario alcanzado[/bold red]")
-                        cuotas_agotadas.add(grupo_cuota)
-                        progress.update(task_current, completed=0, visible=False)
+                        if evento_cuota:
+                            evento_cuota.set()
                     else:
                         error_msg = getattr(resultado, 'error', 'Error desconocido')
                         console.print(f"[red]✗ Error en {nombre_display}: {error_msg}[/red]")
-                        progress.update(task_current, completed=0, visible=False)
-                    progress.advance(task_total)
-                    continue
+                    return False
 
                 # Esperar completado
-                if resultado and getattr(resultado, 'task_id', None):
+                if task_id:
                     progress.update(task_current, description=f"Procesando {nombre_display}...")
-                    await client.artifacts.wait_for_completion(notebook_id, resultado.task_id)
+                    estado = await sondeo.esperar(task_id)
+                    if estado.status == 'failed':
+                        error_msg = getattr(estado, 'error', None) or 'Error desconocido'
+                        console.print(f"[red]✗ Error en {nombre_display}: {error_msg}[/red]")
+                        return False
 
                 console.print(f"[bold green]✓ Completado: {nombre_display}[/bold green]")
-                exitosos += 1
-                progress.update(task_current, completed=100, visible=False)
-                
+                exito = True
+                return exito
+
             except Exception as e:
                 console.print(f"[bold red]✗ Excepción en {nombre_display}: {e}[/bold red]")
-                debug(f"Excepción: {e}")
-                progress.update(task_current, visible=False)
-            
-            progress.advance(task_total)
+                debug("Excepción: %s", e)
+                return False
+
+            finally:
+                progress.update(task_current, completed=100 if exito else 0, visible=False)
+                progress.advance(task_total)
+
+        resultados = await asyncio.gather(*(generar_y_reportar(i, tipo) for i, tipo in enumerate(faltantes)))
+
+    # Los artefactos del cuaderno han cambiado: la próxima verificación debe consultar la API
+    invalidar_cache_artefactos(notebook_id)
+    return sum(resultados)
 
-    return exitosos
+
+def _extraer_contenido_informe(artifacts_raw: list) -> str | None:
+    """Extrae el markdown del informe completado más reciente de los datos raw.
+
+    Replica la selección de download_report de notebooklm-py (art[7][0],
+    ordenado por timestamp de creación en art[15][0]) sin pasar por disco.
+    """
+    candidatos = [
+        art for art in artifacts_raw
+        if isinstance(art, list) and len(art) > 7
+        and art[2] == STUDIO_REPORT and art[4] == ARTIFACT_STATUS_COMPLETED
+    ]
+    if not candidatos:
+        return None
+    mas_reciente = max(
+        candidatos,
+        key=lambda a: a[15][0] if len(a) > 15 and isinstance(a[15], list) and a[15] else 0,
+    )
+    contenido = mas_reciente[7]
+    if isinstance(contenido, list) and contenido:
+        contenido = contenido[0]
+    return contenido if isinstance(contenido, str) else None
 
 
 async def mostrar_informe(client, notebook_id: str):
     """Descarga y muestra el contenido del informe."""
     try:
-        with console.status("[bold green]Descargando informe...", spinner="dots"):
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as f:
-                temp_path = f.name
-            await client.artifacts.download_report(notebook_id, temp_path)
-            contenido = Path(temp_path).read_text(encoding='utf-8')
-            Path(temp_path).unlink(missing_ok=True)
+        with estado_consola("[bold green]Descargando informe...", spinner="dots", refresh_per_second=4):
+            # El markdown del informe ya viene en el listado raw: leerlo en memoria
+            contenido = None
+            try:
+                contenido = _extraer_contenido_informe(await listar_artefactos_raw(client, notebook_id))
+            except Exception as e:
+                debug("No se pudo leer el informe en memoria: %s", e)
+
+            if contenido is None:
+                # Fallback: la API pública solo sabe escribir a un fichero
+                debug("Usando download_report con fichero temporal")
+                import tempfile
+                # El directorio temporal se borra al salir del with, aunque falle la descarga
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    temp_path = Path(temp_dir) / "informe.md"
+                    await client.artifacts.download_report(notebook_id, str(temp_path))
+                    contenido = temp_path.read_text(encoding='utf-8', errors='replace')
 
         console.print("\n[bold]CONTENIDO DEL INFORME[/bold]", style="underline")
-        console.print(contenido)
-        console.print("="*60)
+        # Contenido y separador en una sola escritura
+        console.print(f"{contenido}\n{'=' * 60}")
 
     except Exception as e:
         console.print(f"[bold red]✗ Error al obtener el informe: {e}[/bold red]")
 
 
-def mostrar_estado_artefactos(existentes: dict, urls: dict = None, notebook_id: str = None) -> tuple[list[str], list[str]]:
+def mostrar_estado_artefactos(existentes: ArtefactosExistentes, urls: dict = None, notebook_id: str = None) -> tuple[list[str], list[str]]:
     """Muestra tabla de estado de artefactos y devuelve faltantes.
 
     Args:
-        existentes: Diccionario con listas de artefactos por tipo.
+        existentes: Artefactos existentes por tipo.
         urls: Diccionario {artifact_id: (url, artifact_type)} con URLs de descarga.
         notebook_id: ID del cuaderno para mostrar URL base.
     """
@@ -549,16 +1058,21 @@ def mostrar_estado_artefactos(existentes: dict, urls: dict = None, notebook_id:
     table.add_column("Título", style="white")
     table.add_column("ID", style="dim")
 
+    # Referencias locales para el bucle por artefacto
+    add_row = table.add_row
+    url_de = urls.get
+
     for tipo in ORDEN_ARTEFACTOS:
-        nombre, tiene_limite = TIPOS_ARTEFACTOS[tipo]
-        lista = existentes[tipo]
+        spec = ESPECIFICACIONES_ARTEFACTOS[tipo]
+        nombre, tiene_limite = spec.nombre, spec.tiene_limite
+        lista = getattr(existentes, tipo)
 
         if lista:
             # Mostrar cada artefacto en una fila separada
             for idx, art in enumerate(lista):
                 art_titulo = getattr(art, 'title', None) or '-'
                 art_id = getattr(art, 'id', '-')
-                url_data = urls.get(art_id)
+                url_data = url_de(art_id)
 
                 # Guardar para mostrar URLs después (url_data es tupla (url, artifact_type))
                 if url_data:
@@ -572,35 +1086,36 @@ def mostrar_estado_artefactos(existentes: dict, urls: dict = None, notebook_id:
                 if idx == 0:
                     # Primera fila: mostrar nombre del tipo y estado
                     status = "[bold green]Disponible[/bold green]"
-                    table.add_row(nombre, status, art_titulo, art_id)
+                    add_row(nombre, status, art_titulo, art_id)
                 else:
                     # Filas adicionales del mismo tipo
-                    table.add_row("", "", art_titulo, art_id)
+                    add_row("", "", art_titulo, art_id)
         else:
             status = "[red]No disponible[/red]"
             hint = "⚠ Límite diario" if tiene_limite else "-"
-            table.add_row(nombre, status, "-", hint)
+            add_row(nombre, status, "-", hint)
             faltantes.append(tipo)
             if tiene_limite:
                 faltantes_con_limite.append(tipo)
 
-    console.print("\n", table)
+    # Acumular el resto de la salida para emitirla junto con la tabla
+    lineas = []
 
     # Mostrar URL del cuaderno
     if notebook_id:
-        console.print(f"\n[bold]URL del cuaderno:[/bold]")
-        console.print(f"[yellow]https://notebooklm.google.com/notebook/{notebook_id}[/yellow]")
+        lineas.append("\n[bold]URL del cuaderno:[/bold]")
+        lineas.append(f"[yellow]https://notebooklm.google.com/notebook/{notebook_id}[/yellow]")
 
     # Mostrar URLs de descarga de artefactos
     if artefactos_con_url:
-        console.print(f"\n[bold]URLs de descarga:[/bold]")
+        lineas.append("\n[bold]URLs de descarga:[/bold]")
         comandos_download = []
 
         for nombre, titulo, url, nombre_archivo, art_id, artifact_type in artefactos_con_url:
-            console.print(f"  • [bold cyan]{nombre}[/bold cyan]: [bold white reverse] {titulo} [/bold white reverse]")
-            console.print(f"    [yellow]{url}[/yellow]")
+            lineas.append(f"  • [bold cyan]{nombre}[/bold cyan]: [bold white reverse] {titulo} [/bold white reverse]")
+            lineas.append(f"    [yellow]{url}[/yellow]")
             if nombre_archivo:
-                console.print(f"    [dim]Guardar como: {nombre_archivo}[/dim]")
+                lineas.append(f"    [dim]Guardar como: {nombre_archivo}[/dim]")
                 # Generar comando notebooklm download
                 subcomando = _subcomando_por_tipo(artifact_type)
                 if subcomando:
@@ -608,10 +1123,16 @@ def mostrar_estado_artefactos(existentes: dict, urls: dict = None, notebook_id:
 
         # Mostrar comandos notebooklm download
         if comandos_download and notebook_id:
-            console.print(f"\n[bold]Comandos para descargar:[/bold]")
+            lineas.append("\n[bold]Comandos para descargar:[/bold]")
             for nombre, titulo, nombre_archivo, art_id, subcomando in comandos_download:
-                console.print(f"\n# {nombre}: {titulo}")
-                console.print(f'notebooklm download {subcomando} -n {notebook_id} \\')
-                console.print(f'  -a {art_id} "{nombre_archivo}"')
+                lineas.append(f"\n# {nombre}: {titulo}")
+                lineas.append(f'notebooklm download {subcomando} -n {notebook_id} \\')
+                lineas.append(f'  -a {art_id} "{nombre_archivo}"')
+
+    # Un único render: tabla + URLs + comandos
+    partes = [table]
+    if lineas:
+        partes.append("\n".join(lineas))
+    console.print("\n", Group(*partes))
 
     return faltantes, faltantes_con_limite
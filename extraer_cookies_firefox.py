@@ -26,10 +26,11 @@ Ventajas:
    carpeta en: C:\\Users\\<usuario>\\AppData\\Roaming\\Mozilla\\Firefox\\Profiles\\
    El script busca el perfil por defecto (o el que indiques con --perfil).
 
-2. COPIAR LA BASE DE DATOS DE COOKIES
+2. ABRIR LA BASE DE DATOS DE COOKIES
    Firefox guarda las cookies en un archivo SQLite llamado "cookies.sqlite".
-   Como Firefox puede tener el archivo bloqueado mientras está abierto,
-   el script hace una copia temporal para poder leerlo.
+   El script lo abre en modo solo lectura e "inmutable", sin bloqueos, así
+   que funciona aunque Firefox esté abierto. Si SQLite no puede leerlo así,
+   se hace una copia temporal y se lee la copia.
 
 3. EXTRAER LAS COOKIES DE GOOGLE
    De todas las cookies en la base de datos, el script filtra solo las que:
@@ -64,12 +65,13 @@ Plataformas soportadas:
     - Windows: PowerShell o CMD con Firefox instalado en Windows
     - Linux: Firefox instalado en Linux nativo
     - macOS: Firefox instalado en macOS
+    - También LibreWolf, Floorp y Waterfox si Firefox no está instalado
 
 Requisitos:
     - Firefox instalado con sesión activa de Google/NotebookLM
 
 Notas:
-    - Firefox puede estar abierto (se copia la base de datos)
+    - Firefox puede estar abierto (se lee la base de datos sin bloquearla)
     - Las cookies se filtran a dominios de Google relevantes para NotebookLM
     - Se crea backup automático del archivo anterior (.json.bak)
     - La plataforma se detecta automáticamente
@@ -82,15 +84,27 @@ Notas:
 # Todas vienen incluidas con Python, no hay que instalar nada extra.
 
 import argparse      # Para procesar los argumentos de línea de comandos (--perfil, --dry-run, etc.)
+import asyncio       # Para leer varios perfiles a la vez (--buscar-sesion)
+import configparser  # Para leer profiles.ini (formato INI) de Firefox
+import functools     # Para cachear resultados de funciones (lru_cache)
 import json          # Para leer/escribir archivos JSON
 import os            # Para operaciones del sistema operativo (rutas, permisos)
 import shutil        # Para copiar archivos
 import sqlite3       # Para leer la base de datos SQLite de Firefox
 import sys           # Para salir del programa con código de error
-import tempfile      # Para crear archivos temporales
 from datetime import datetime  # Para obtener la fecha/hora actual
+from itertools import groupby  # Para agrupar elementos consecutivos iguales
+from operator import itemgetter  # Para extraer una clave de cada diccionario
 from pathlib import Path       # Para manejar rutas de archivos de forma moderna
 
+# orjson es opcional: si está instalado se usa para generar el JSON (es más
+# rápido que json con indent, que no puede usar el acelerador en C). Si no,
+# el script funciona igual con el módulo json estándar.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 VERSION = "1.0.0"
 
 # ==============================================================================
@@ -152,6 +166,30 @@ AUTH_COOKIE_NAMES = {
 # Sin al menos SID, no hay sesión válida
 REQUIRED_COOKIES = {'SID'}
 
+# Conversión del atributo sameSite de formato Firefox a formato Playwright
+# Firefox usa números: 0=None, 1=Lax, 2=Strict
+# Playwright usa strings: "None", "Lax", "Strict"
+SAME_SITE_PLAYWRIGHT = {0: "None", 1: "Lax", 2: "Strict"}
+
+# Conjunto exacto de valores de 'host' cuyas cookies nos interesan:
+# dominios principales más los regionales, con y sin punto inicial.
+# Se calcula una sola vez al cargar el script; lo usan tanto la consulta SQL
+# como es_dominio_permitido().
+HOSTS_PERMITIDOS = frozenset(
+    {'.google.com', 'notebooklm.google.com', 'accounts.google.com'}
+    | GOOGLE_REGIONAL_SUFFIXES
+    | {regional.lstrip('.') for regional in GOOGLE_REGIONAL_SUFFIXES}
+)
+
+# Columna baseDomain de moz_cookies para esos hosts: el dominio registrable,
+# sin punto ni subdominios (ej: 'google.com' para '.google.com' y para
+# 'notebooklm.google.com'). Firefox tiene un índice sobre esta columna
+# (moz_basedomain), así que filtrar por ella evita recorrer toda la tabla.
+DOMINIOS_BASE_PERMITIDOS = frozenset(
+    {'google.com'}
+    | {regional.lstrip('.') for regional in GOOGLE_REGIONAL_SUFFIXES}
+)
+
 # ==============================================================================
 # CONFIGURACIÓN: RUTAS DE FIREFOX
 # ==============================================================================
@@ -171,11 +209,48 @@ FIREFOX_PROFILES_LINUX   = "/home/{user}/.mozilla/firefox"
 # Ruta en macOS
 FIREFOX_PROFILES_MACOS   = "/Users/{user}/Library/Application Support/Firefox/Profiles"
 
+# Navegadores derivados de Firefox (LibreWolf, Floorp, Waterfox) usan el mismo
+# formato de perfiles y de cookies.sqlite, pero en otra carpeta.
+# Si no existe la carpeta de Firefox, se prueban estas en orden y se usa
+# la primera que exista.
+RUTAS_PERFILES_DERIVADOS = {
+    'wsl': [
+        "/mnt/c/Users/{user}/AppData/Roaming/librewolf/Profiles",
+        "/mnt/c/Users/{user}/AppData/Roaming/Floorp/Profiles",
+        "/mnt/c/Users/{user}/AppData/Roaming/Waterfox/Profiles",
+    ],
+    'windows': [
+        r"C:\Users\{user}\AppData\Roaming\librewolf\Profiles",
+        r"C:\Users\{user}\AppData\Roaming\Floorp\Profiles",
+        r"C:\Users\{user}\AppData\Roaming\Waterfox\Profiles",
+    ],
+    'linux': [
+        "/home/{user}/.librewolf",
+        "/home/{user}/.floorp",
+        "/home/{user}/.waterfox",
+    ],
+    'macos': [
+        "/Users/{user}/Library/Application Support/librewolf/Profiles",
+        "/Users/{user}/Library/Application Support/Floorp/Profiles",
+        "/Users/{user}/Library/Application Support/Waterfox/Profiles",
+    ],
+}
+
+# Terminaciones que Firefox pone a las carpetas de los perfiles por defecto
+# (ej: 'vonalg81.default-release'). Se comparan con endswith() y no con "in"
+# para que una carpeta como 'x.nodefault-release-copia' no cuente como default.
+SUFIJO_PERFIL_PRINCIPAL = '.default-release'
+SUFIJOS_PERFIL_DEFECTO = ('.default-release', '.default', '.default-esr')
+
 
+@functools.lru_cache(maxsize=1)
 def detectar_plataforma() -> str:
     """
     Detecta en qué plataforma está corriendo el script.
 
+    La plataforma no cambia durante la ejecución, así que lru_cache guarda
+    el resultado y solo se comprueba /mnt/c/Windows la primera vez.
+
     Returns:
         'wsl': Windows Subsystem for Linux (accediendo a Firefox de Windows)
         'windows': Windows nativo (PowerShell, CMD)
@@ -201,29 +276,46 @@ def detectar_plataforma() -> str:
         return 'linux'
 
 
+@functools.lru_cache(maxsize=8)
 def obtener_ruta_perfiles(usuario: str, plataforma: str = None) -> Path:
     """
     Obtiene la ruta al directorio de perfiles de Firefox según la plataforma.
 
+    Si la carpeta de Firefox no existe, prueba las de los navegadores
+    derivados (RUTAS_PERFILES_DERIVADOS) y devuelve la primera que exista.
+    Resultado cacheado por (usuario, plataforma) con lru_cache.
+
     Args:
         usuario: Nombre de usuario
         plataforma: Forzar plataforma ('wsl', 'windows', 'linux', 'macos').
                     Si es None, se detecta automáticamente.
 
     Returns:
-        Path al directorio de perfiles de Firefox
+        Path al directorio de perfiles encontrado. Si no existe ninguno,
+        la ruta de Firefox (para que el mensaje de error la muestre).
     """
     if plataforma is None:
         plataforma = detectar_plataforma()
 
     if plataforma == 'wsl':
-        return Path(FIREFOX_PROFILES_WSL.format(user=usuario))
+        ruta_firefox = Path(FIREFOX_PROFILES_WSL.format(user=usuario))
     elif plataforma == 'windows':
-        return Path(FIREFOX_PROFILES_WINDOWS.format(user=usuario))
+        ruta_firefox = Path(FIREFOX_PROFILES_WINDOWS.format(user=usuario))
     elif plataforma == 'macos':
-        return Path(FIREFOX_PROFILES_MACOS.format(user=usuario))
+        ruta_firefox = Path(FIREFOX_PROFILES_MACOS.format(user=usuario))
     else:  # linux
-        return Path(FIREFOX_PROFILES_LINUX.format(user=usuario))
+        ruta_firefox = Path(FIREFOX_PROFILES_LINUX.format(user=usuario))
+
+    if ruta_firefox.exists():
+        return ruta_firefox
+
+    # Firefox no está: probar los derivados (como mucho un stat por candidato)
+    for plantilla in RUTAS_PERFILES_DERIVADOS.get(plataforma, RUTAS_PERFILES_DERIVADOS['linux']):
+        candidata = Path(plantilla.format(user=usuario))
+        if candidata.exists():
+            return candidata
+
+    return ruta_firefox
 
 
 # ==============================================================================
@@ -249,6 +341,73 @@ def extraer_nombre_bonito(nombre_dir: str) -> str:
     return nombre_dir
 
 
+@functools.lru_cache(maxsize=None)
+def leer_profiles_ini(base: Path) -> tuple[dict[str, Path], Path | None]:
+    """
+    Lee profiles.ini de Firefox para saber qué perfiles hay y cuál es el de por defecto.
+
+    Firefox registra sus perfiles en un archivo profiles.ini. Leerlo es más
+    fiable que adivinar por el nombre de la carpeta: si existen a la vez
+    'xxx.default' y 'yyy.default-release', el INI dice cuál usa Firefox.
+
+    El archivo está en el propio directorio de perfiles (Linux: ~/.mozilla/firefox)
+    o en su directorio padre (Windows/macOS: .../Firefox/profiles.ini, con los
+    perfiles dentro de .../Firefox/Profiles).
+
+    lru_cache guarda el resultado: el archivo se lee una sola vez por ejecución.
+
+    Args:
+        base: Path al directorio de perfiles (el de obtener_ruta_perfiles)
+
+    Returns:
+        Tupla (perfiles, por_defecto):
+        - perfiles: diccionario {nombre_del_perfil: ruta_del_directorio}
+        - por_defecto: ruta del perfil por defecto, o None si no se puede saber
+        Si no existe profiles.ini devuelve ({}, None).
+    """
+    for ini in (base / 'profiles.ini', base.parent / 'profiles.ini'):
+        if ini.is_file():
+            break
+    else:
+        return {}, None
+
+    # Las rutas relativas del INI son relativas al directorio donde está el INI
+    raiz = ini.parent
+    config = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        # installs.ini (versiones antiguas) y las secciones [Install...] de profiles.ini
+        # guardan el perfil por defecto de cada instalación de Firefox
+        config.read([ini, raiz / 'installs.ini'], encoding='utf-8')
+    except configparser.Error:
+        return {}, None
+
+    def resolver(ruta: str, relativa: bool) -> Path:
+        return raiz / ruta if relativa else Path(ruta)
+
+    perfiles = {}
+    por_defecto_instalacion = None
+    por_defecto_marcado = None
+
+    for seccion in config.sections():
+        datos = config[seccion]
+        if seccion.startswith('Profile') and 'Path' in datos:
+            # [Profile0] Name=default-release, Path=Profiles/xxx.default-release, IsRelative=1
+            ruta = resolver(datos['Path'], datos.get('IsRelative', '1') == '1')
+            perfiles[datos.get('Name', ruta.name)] = ruta
+            if datos.get('Default') == '1':
+                por_defecto_marcado = ruta
+        elif 'Default' in datos and por_defecto_instalacion is None:
+            # [Install<hash>] Default=Profiles/xxx.default-release (perfil de esa instalación)
+            por_defecto_instalacion = resolver(datos['Default'], not Path(datos['Default']).is_absolute())
+
+    # El perfil de la instalación tiene prioridad sobre el marcado con Default=1
+    # (este último suele ser el perfil 'default' antiguo)
+    for candidato in (por_defecto_instalacion, por_defecto_marcado):
+        if candidato is not None and candidato.is_dir():
+            return perfiles, candidato
+    return perfiles, None
+
+
 def listar_perfiles_firefox(usuario: str) -> list[tuple[str, str, bool]]:
     """
     Lista los perfiles de Firefox disponibles para un usuario.
@@ -268,14 +427,29 @@ def listar_perfiles_firefox(usuario: str) -> list[tuple[str, str, bool]]:
     if not base.exists():
         raise FileNotFoundError(f"No se encuentra directorio de perfiles Firefox: {base}")
 
+    # Si hay profiles.ini, él dice cuál es el perfil por defecto
+    _, por_defecto = leer_profiles_ini(base)
+
+    # os.scandir() lista el directorio y ya sabe qué entradas son carpetas
+    # (el sistema lo indica al leer el directorio), así que no hace falta un
+    # stat() por entrada como con Path.is_dir(). En WSL, cada stat sobre
+    # /mnt/c/ es una llamada lenta al sistema de archivos de Windows.
+    with os.scandir(base) as entradas:
+        # Solo directorios, ignorar archivos; sorted() ordena alfabéticamente
+        directorios = sorted(
+            (e for e in entradas if e.is_dir()),
+            key=lambda e: e.name,
+        )
+
     perfiles = []
-    # sorted() ordena alfabéticamente, iterdir() lista el contenido del directorio
-    for p in sorted(base.iterdir()):
-        if p.is_dir():  # Solo directorios, ignorar archivos
-            nombre_bonito = extraer_nombre_bonito(p.name)
-            # Firefox marca los perfiles por defecto con 'default-release' o '.default'
-            es_default = 'default-release' in p.name or p.name.endswith('.default')
-            perfiles.append((p.name, nombre_bonito, es_default))
+    for entrada in directorios:
+        nombre_bonito = extraer_nombre_bonito(entrada.name)
+        if por_defecto is not None:
+            es_default = Path(entrada.path) == por_defecto
+        else:
+            # Sin INI: Firefox marca los perfiles por defecto con '.default-release' o '.default'
+            es_default = entrada.name.endswith(SUFIJOS_PERFIL_DEFECTO)
+        perfiles.append((entrada.name, nombre_bonito, es_default))
 
     return perfiles
 
@@ -300,25 +474,41 @@ def encontrar_perfil_firefox(usuario: str, nombre_perfil: str = None) -> Path:
     if not base.exists():
         raise FileNotFoundError(f"No se encuentra directorio de perfiles Firefox: {base}")
 
-    perfiles = list(base.iterdir())
-
     if nombre_perfil:
-        # Buscar perfil que contenga el texto especificado
-        for p in perfiles:
-            if nombre_perfil in p.name:
-                return p
+        # Buscar perfil que contenga el texto especificado (el primero que aparezca)
+        with os.scandir(base) as entradas:
+            for entrada in entradas:
+                if nombre_perfil in entrada.name:
+                    return Path(entrada.path)
         raise FileNotFoundError(f"Perfil '{nombre_perfil}' no encontrado en {base}")
 
     # Si no se especificó perfil, buscar el por defecto
-    # Prioridad 1: perfil 'default-release' (el principal en instalaciones modernas)
-    for p in perfiles:
-        if 'default-release' in p.name:
-            return p
-
-    # Prioridad 2: cualquier perfil con 'default' en el nombre
-    for p in perfiles:
-        if 'default' in p.name:
-            return p
+    # Prioridad 0: el que indica profiles.ini (lo que usa Firefox realmente)
+    _, por_defecto = leer_profiles_ini(base)
+    if por_defecto is not None:
+        return por_defecto
+
+    # Sin profiles.ini, adivinar por el nombre de la carpeta
+    # Una sola pasada por el directorio separando candidatos por prioridad:
+    # Prioridad 1: perfil '.default-release' (el principal en instalaciones modernas)
+    # Prioridad 2: cualquier perfil terminado en '.default', '.default-esr', etc.
+    principales = []
+    otros = []
+    with os.scandir(base) as entradas:
+        for entrada in entradas:
+            if entrada.name.endswith(SUFIJO_PERFIL_PRINCIPAL):
+                principales.append(entrada)
+            # endswith() acepta una tupla y prueba todos los sufijos de una vez
+            elif entrada.name.endswith(SUFIJOS_PERFIL_DEFECTO):
+                otros.append(entrada)
+
+    # Si hay varios de la misma prioridad (ej: un perfil viejo abandonado),
+    # elegir el modificado más recientemente. DirEntry.stat() guarda el
+    # resultado, así que cada candidato se consulta una sola vez.
+    for candidatos in (principales, otros):
+        if candidatos:
+            elegido = max(candidatos, key=lambda e: e.stat().st_mtime)
+            return Path(elegido.path)
 
     raise FileNotFoundError(f"No se encontró perfil por defecto en {base}")
 
@@ -342,14 +532,64 @@ def copiar_cookies_db(perfil: Path) -> Path:
     if not cookies_db.exists():
         raise FileNotFoundError(f"No se encuentra {cookies_db}")
 
+    # tempfile solo se usa aquí, así que lo importamos dentro de la función:
+    # opciones como --listar-perfiles no pagan el coste de cargarlo
+    import tempfile
+
     # Crear archivo temporal con extensión .sqlite
-    temp_db = Path(tempfile.mktemp(suffix=".sqlite"))
-    # copy2 preserva metadatos (fechas, permisos)
-    shutil.copy2(cookies_db, temp_db)
+    # NamedTemporaryFile lo crea de forma atómica (otro proceso no puede
+    # quitarnos el nombre, como podía pasar con mktemp); delete=False para
+    # que siga existiendo al cerrarlo y poder copiar encima
+    with tempfile.NamedTemporaryFile(suffix=".sqlite", delete=False) as tf:
+        temp_db = Path(tf.name)
+
+    # copyfile copia solo el contenido: la copia es temporal y no necesitamos
+    # sus fechas ni permisos (copy2 haría llamadas extra para preservarlos).
+    # En Linux usa sendfile(), que copia dentro del kernel sin pasar por Python.
+    try:
+        shutil.copyfile(cookies_db, temp_db)
+    except OSError:
+        # Si la copia falla, no dejar el archivo temporal vacío abandonado
+        temp_db.unlink(missing_ok=True)
+        raise
 
     return temp_db
 
 
+def leer_cookies_perfil(perfil: Path) -> list[dict]:
+    """
+    Lee las cookies de Google del perfil sin copiar cookies.sqlite si es posible.
+
+    Primero abre el archivo original en modo inmutable (sin bloqueos). Si
+    SQLite no puede leerlo así (por ejemplo, porque Firefox lo está
+    reescribiendo justo en ese momento), recurre a la copia temporal.
+
+    Args:
+        perfil: Path al directorio del perfil de Firefox
+
+    Returns:
+        Lista de cookies, igual que extraer_cookies_google()
+    """
+    cookies_db = perfil / "cookies.sqlite"
+
+    if not cookies_db.exists():
+        raise FileNotFoundError(f"No se encuentra {cookies_db}")
+
+    try:
+        return extraer_cookies_google(cookies_db, inmutable=True)
+    except sqlite3.DatabaseError:
+        # DatabaseError incluye OperationalError (base de datos ocupada) y
+        # los errores de "archivo corrupto" que da leer a mitad de escritura
+        print("  No se pudo leer directamente, copiando base de datos...")
+
+    temp_db = copiar_cookies_db(perfil)
+    try:
+        return extraer_cookies_google(temp_db)
+    finally:
+        # El bloque finally se ejecuta siempre, haya error o no
+        temp_db.unlink(missing_ok=True)  # unlink = eliminar archivo
+
+
 def es_dominio_permitido(host: str) -> bool:
     """
     Verifica si el dominio es relevante para NotebookLM.
@@ -363,23 +603,9 @@ def es_dominio_permitido(host: str) -> bool:
     Returns:
         True si la cookie es de un dominio necesario para NotebookLM
     """
-    # Dominios principales que necesitamos
-    dominios_necesarios = {
-        '.google.com',              # Cookies de sesión principales
-        'notebooklm.google.com',    # Cookies específicas de NotebookLM
-        'accounts.google.com',      # Cookies de autenticación
-    }
-
-    if host in dominios_necesarios:
-        return True
-
-    # También aceptar dominios regionales (para usuarios de España, UK, etc.)
-    for regional in GOOGLE_REGIONAL_SUFFIXES:
-        # lstrip('.') quita el punto inicial para comparar
-        if host == regional.lstrip('.') or host == regional:
-            return True
-
-    return False
+    # HOSTS_PERMITIDOS ya contiene los dominios principales y los regionales
+    # (con y sin punto inicial), así que basta una búsqueda en el frozenset
+    return host in HOSTS_PERMITIDOS
 
 
 def es_cookie_auth(name: str) -> bool:
@@ -395,7 +621,7 @@ def es_cookie_auth(name: str) -> bool:
     return name in AUTH_COOKIE_NAMES
 
 
-def extraer_cookies_google(db_path: Path) -> list[dict]:
+def extraer_cookies_google(db_path: Path, inmutable: bool = False) -> list[dict]:
     """
     Extrae cookies de autenticación de Google de la base de datos de Firefox.
 
@@ -404,75 +630,150 @@ def extraer_cookies_google(db_path: Path) -> list[dict]:
     que espera Playwright/notebooklm-py.
 
     Args:
-        db_path: Path a la copia temporal de cookies.sqlite
+        db_path: Path a cookies.sqlite (el original o una copia temporal)
+        inmutable: Si es True, abre el archivo en modo solo lectura e
+                   inmutable, sin tomar bloqueos ni tocar el journal
 
     Returns:
         Lista de diccionarios, cada uno representando una cookie
     """
-    # Diccionario para deduplicar: clave=(nombre, dominio), valor=cookie
-    cookies_dict = {}
+    cookies = []
 
     # Conectar a la base de datos SQLite
-    conn = sqlite3.connect(str(db_path))
-    # row_factory=Row permite acceder a columnas por nombre (row['name'])
-    conn.row_factory = sqlite3.Row
+    if inmutable:
+        # Sintaxis URI de SQLite: mode=ro abre en solo lectura e immutable=1
+        # le dice a SQLite que el archivo no va a cambiar, así que no intenta
+        # bloquearlo (Firefox lo tiene bloqueado) ni recuperar el journal.
+        # as_uri() necesita una ruta absoluta y escapa espacios y acentos.
+        uri = f"{db_path.resolve().as_uri()}?mode=ro&immutable=1"
+        # isolation_level=None: sin transacciones implícitas (solo leemos)
+        conn = sqlite3.connect(uri, uri=True, isolation_level=None)
+    else:
+        conn = sqlite3.connect(str(db_path), isolation_level=None)
+    # Solo vamos a leer: query_only impide cualquier escritura accidental
+    # y temp_store=MEMORY evita ficheros temporales para el GROUP BY/ORDER BY
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    # mmap_size: leer las páginas mapeando el archivo en memoria en lugar de
+    # copiarlas con read() (256 MB es un máximo; cookies.sqlite es mucho menor)
+    # cache_size negativo = tamaño en KiB: 8 MB de caché de páginas
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA cache_size = -8192")
     cursor = conn.cursor()
 
     # Consulta SQL para obtener cookies de Google
-    # ORDER BY expiry DESC = ordenar por expiración descendente (más tardía primero)
-    # Esto nos permite quedarnos con la cookie más "fresca" si hay duplicados
-    query = """
-        SELECT name, value, host, path, expiry, isSecure, isHttpOnly, sameSite
+    # Los filtros por dominio y por nombre se hacen en SQLite: así Python solo
+    # recibe las cookies de autenticación (unas decenas) en vez de todas.
+    # host IN (...) con valores exactos es más selectivo que LIKE '%google%',
+    # que obliga a revisar todas las filas de la tabla.
+    # Los "?" son parámetros: sqlite3 sustituye cada uno por un valor de la lista.
+    # GROUP BY name, host deduplica: deja una fila por cookie (mismo nombre+dominio).
+    # Con MAX(expiry), SQLite toma las demás columnas de la fila con la
+    # expiración más tardía, es decir, nos quedamos con la cookie más "fresca".
+    # ORDER BY host, name = ordenar por dominio y nombre para salida consistente
+    # baseDomain IN (...) permite a SQLite usar el índice moz_basedomain para
+    # saltar directamente a las filas de Google; host IN (...) afina después.
+    dominios_base = sorted(DOMINIOS_BASE_PERMITIDOS)
+    hosts = sorted(HOSTS_PERMITIDOS)
+    nombres = sorted(AUTH_COOKIE_NAMES)
+    query = f"""
+        SELECT name, value, host, path, MAX(expiry), isSecure, isHttpOnly, sameSite
         FROM moz_cookies
-        WHERE host LIKE '%google%'
-        ORDER BY expiry DESC
+        WHERE baseDomain IN ({", ".join("?" * len(dominios_base))})
+          AND host IN ({", ".join("?" * len(hosts))})
+          AND name IN ({", ".join("?" * len(nombres))})
+        GROUP BY name, host
+        ORDER BY host, name
     """
 
-    cursor.execute(query)
+    cursor.execute(query, dominios_base + hosts + nombres)
 
     # Procesar cada cookie encontrada
-    for row in cursor.fetchall():
-        host = row['host']
-        name = row['name']
-
+    # Iterar el cursor directamente lee las filas de una en una (sin fetchall)
+    # Cada fila es una tupla con las columnas en el orden del SELECT; se
+    # desempaqueta directamente en variables (más rápido que sqlite3.Row)
+    for name, value, host, path, expiry, is_secure, is_http_only, same_site in cursor:
         # Aplicar filtros: solo dominios permitidos Y cookies de autenticación
         if not es_dominio_permitido(host):
             continue
         if not es_cookie_auth(name):
             continue
 
-        # Deduplicar: si ya tenemos esta cookie (mismo nombre+dominio), saltar
-        # Como ordenamos por expiración DESC, la primera que encontramos es la mejor
-        key = (name, host)
-        if key in cookies_dict:
-            continue
-
-        # Convertir el atributo sameSite de formato Firefox a formato Playwright
-        # Firefox usa números: 0=None, 1=Lax, 2=Strict
-        # Playwright usa strings: "None", "Lax", "Strict"
-        same_site_map = {0: "None", 1: "Lax", 2: "Strict"}
-        same_site = same_site_map.get(row['sameSite'], "Lax")
-
         # Crear diccionario con el formato que espera Playwright
-        cookie = {
+        # sameSite se traduce de número (Firefox) a texto (Playwright)
+        cookies.append({
             "name": name,
-            "value": row['value'],
+            "value": value,
             "domain": host,
-            "path": row['path'],
-            "expires": row['expiry'],           # Timestamp Unix de expiración
-            "httpOnly": bool(row['isHttpOnly']), # ¿Solo accesible por HTTP, no JavaScript?
-            "secure": bool(row['isSecure']),     # ¿Solo enviar por HTTPS?
-            "sameSite": same_site,               # Política de envío cross-site
-        }
-        cookies_dict[key] = cookie
+            "path": path,
+            "expires": expiry,                   # Timestamp Unix de expiración
+            "httpOnly": bool(is_http_only),      # ¿Solo accesible por HTTP, no JavaScript?
+            "secure": bool(is_secure),           # ¿Solo enviar por HTTPS?
+            "sameSite": SAME_SITE_PLAYWRIGHT.get(same_site, "Lax"),  # Política cross-site
+        })
 
     conn.close()
 
-    # Ordenar alfabéticamente por dominio y nombre para salida consistente
-    cookies = sorted(cookies_dict.values(), key=lambda c: (c['domain'], c['name']))
     return cookies
 
 
+def buscar_perfil_con_sesion(usuario: str) -> tuple[Path, list[dict]]:
+    """
+    Lee las cookies de todos los perfiles a la vez y elige el que tiene sesión.
+
+    Cada perfil tiene su propio cookies.sqlite, así que se pueden leer en
+    paralelo sin bloquearse entre sí: asyncio.to_thread() lanza cada lectura
+    en un hilo y asyncio.gather() espera a todas. Con 4 perfiles se tarda
+    más o menos lo mismo que con uno.
+
+    Args:
+        usuario: Nombre de usuario
+
+    Returns:
+        Tupla (perfil, cookies) del perfil elegido: entre los que tienen las
+        cookies mínimas, el de la cookie SID que caduca más tarde (la sesión
+        más reciente). Si ninguno las tiene, el que más cookies tenga.
+    """
+    base = obtener_ruta_perfiles(usuario)
+    perfiles = [
+        base / nombre_dir
+        for nombre_dir, _, _ in listar_perfiles_firefox(usuario)
+        if (base / nombre_dir / "cookies.sqlite").exists()
+    ]
+    if not perfiles:
+        raise FileNotFoundError(f"Ningún perfil de {base} tiene cookies.sqlite")
+
+    async def leer_todos():
+        # return_exceptions=True: un perfil ilegible no impide leer los demás
+        return await asyncio.gather(
+            *(asyncio.to_thread(leer_cookies_perfil, perfil) for perfil in perfiles),
+            return_exceptions=True,
+        )
+
+    resultados = asyncio.run(leer_todos())
+
+    def puntuacion(perfil_y_cookies):
+        cookies = perfil_y_cookies[1]
+        ok, _ = verificar_cookies_minimas(cookies)
+        expiracion_sid = max((c['expires'] for c in cookies if c['name'] == 'SID'), default=0)
+        # Las tuplas se comparan elemento a elemento: primero ok, luego SID...
+        return ok, expiracion_sid, len(cookies)
+
+    leidos = []
+    for perfil, resultado in zip(perfiles, resultados):
+        if isinstance(resultado, Exception):
+            print(f"  {perfil.name}: error leyendo cookies ({resultado})")
+        else:
+            print(f"  {perfil.name}: {len(resultado)} cookies")
+            leidos.append((perfil, resultado))
+
+    if not leidos:
+        # Todos fallaron: propagar el primer error (lo gestiona main)
+        raise next(r for r in resultados if isinstance(r, Exception))
+
+    return max(leidos, key=puntuacion)
+
+
 def verificar_cookies_minimas(cookies: list[dict]) -> tuple[bool, list[str]]:
     """
     Verifica que estén presentes las cookies mínimas requeridas.
@@ -523,6 +824,27 @@ def generar_storage_state(cookies: list[dict], perfil_dir: str, perfil_nombre: s
     }
 
 
+def serializar_json(datos: dict) -> str:
+    """
+    Convierte un diccionario a texto JSON indentado con 2 espacios.
+
+    Usa orjson si está disponible y, si no, el módulo json estándar.
+    orjson escribe los caracteres no ASCII tal cual (ñ, á...), mientras que
+    json los escapa (\\u00f1) salvo con ensure_ascii=False: se usa esa opción
+    para que ambos den el mismo texto. Por eso el archivo se escribe en UTF-8.
+
+    Args:
+        datos: Diccionario a serializar (ej: el de generar_storage_state)
+
+    Returns:
+        Texto JSON
+    """
+    if orjson is not None:
+        # orjson devuelve bytes; decode() los convierte a texto
+        return orjson.dumps(datos, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(datos, indent=2, ensure_ascii=False)
+
+
 # ==============================================================================
 # FUNCIÓN PRINCIPAL
 # ==============================================================================
@@ -549,6 +871,7 @@ Ejemplos:
   python extraer_cookies_firefox.py                    # Usa perfil por defecto
   python extraer_cookies_firefox.py --listar-perfiles  # Ver perfiles disponibles
   python extraer_cookies_firefox.py --perfil Susana    # Perfil específico
+  python extraer_cookies_firefox.py --buscar-sesion    # Perfil con sesión de Google
   python extraer_cookies_firefox.py --dry-run          # Solo muestra, no escribe
   python extraer_cookies_firefox.py -o /tmp/test.json  # Output personalizado
         '''
@@ -561,6 +884,9 @@ Ejemplos:
                              'el nombre completo del directorio (ej: kyetl4dz.Susana), o cualquier '
                              'texto contenido en el nombre. Usa --listar-perfiles para ver opciones. '
                              '(default: default-release)')
+    parser.add_argument('--buscar-sesion', '-b', action='store_true',
+                        help='Lee todos los perfiles a la vez y usa el que tiene '
+                             'sesión de Google (ignora --perfil)')
     parser.add_argument('--output', '-o',
                         default=os.path.expanduser('~/.notebooklm/storage_state.json'),
                         help='Ruta de salida (default: ~/.notebooklm/storage_state.json)')
@@ -602,90 +928,84 @@ Ejemplos:
         # ---------------------------------------------------------------------
         plataforma = detectar_plataforma()
         print(f"Plataforma detectada: {plataforma}")
-        print(f"Buscando perfil de Firefox para usuario '{args.usuario}'...")
-        perfil = encontrar_perfil_firefox(args.usuario, args.perfil)
+        if args.buscar_sesion:
+            # Con --buscar-sesion se leen las cookies de todos los perfiles
+            # (PASOS 1 a 3 a la vez) y se elige el que tiene sesión
+            print(f"Buscando sesión de Google en los perfiles de '{args.usuario}'...")
+            perfil, cookies = buscar_perfil_con_sesion(args.usuario)
+        else:
+            print(f"Buscando perfil de Firefox para usuario '{args.usuario}'...")
+            perfil = encontrar_perfil_firefox(args.usuario, args.perfil)
+            cookies = None
         nombre_bonito = extraer_nombre_bonito(perfil.name)
         print(f"  Perfil: {nombre_bonito} ({perfil.name})")
 
-        # PASO 2: Copiar la base de datos de cookies
+        # PASO 2 y 3: Leer la base de datos y extraer las cookies de Google
         # ---------------------------------------------------------------------
-        # Copiamos porque Firefox puede tener el archivo bloqueado
-        print("Copiando base de datos de cookies...")
-        temp_db = copiar_cookies_db(perfil)
-
-        try:
-            # PASO 3: Extraer las cookies de Google
-            # -----------------------------------------------------------------
+        # Se lee el archivo original sin bloquearlo; solo si falla se copia
+        if cookies is None:
             print("Extrayendo cookies de Google...")
-            cookies = extraer_cookies_google(temp_db)
-            print(f"  Cookies encontradas: {len(cookies)}")
-
-            # Mostrar detalle si se pidió verbose o dry-run
-            if args.verbose or args.dry_run:
-                # Agrupar cookies por dominio para mostrar resumen
-                por_dominio = {}
-                for c in cookies:
-                    d = c['domain']
-                    if d not in por_dominio:
-                        por_dominio[d] = []
-                    por_dominio[d].append(c['name'])
-
-                print("\n  Cookies por dominio:")
-                for dominio, nombres in sorted(por_dominio.items()):
-                    print(f"    {dominio}: {', '.join(sorted(nombres))}")
-
-            # PASO 4: Verificar que están las cookies mínimas
-            # -----------------------------------------------------------------
-            ok, faltantes = verificar_cookies_minimas(cookies)
-            if not ok:
-                print(f"\n⚠ Faltan cookies requeridas: {', '.join(faltantes)}")
-                print("  ¿Tienes sesión activa de Google en Firefox?")
-                sys.exit(1)
+            cookies = leer_cookies_perfil(perfil)
+        print(f"  Cookies encontradas: {len(cookies)}")
+
+        # Mostrar detalle si se pidió verbose o dry-run
+        if args.verbose or args.dry_run:
+            # Agrupar cookies por dominio para mostrar resumen
+            # extraer_cookies_google() ya las devuelve ordenadas por (dominio,
+            # nombre), así que groupby() agrupa en una sola pasada y tanto
+            # los dominios como los nombres de cada grupo salen ya ordenados
+            print("\n  Cookies por dominio:")
+            for dominio, grupo in groupby(cookies, key=itemgetter('domain')):
+                print(f"    {dominio}: {', '.join(c['name'] for c in grupo)}")
+
+        # PASO 4: Verificar que están las cookies mínimas
+        # ---------------------------------------------------------------------
+        ok, faltantes = verificar_cookies_minimas(cookies)
+        if not ok:
+            print(f"\n⚠ Faltan cookies requeridas: {', '.join(faltantes)}")
+            print("  ¿Tienes sesión activa de Google en Firefox?")
+            sys.exit(1)
 
-            print("\n✓ Cookies requeridas presentes (SID, HSID, SSID)")
+        print("\n✓ Cookies requeridas presentes (SID, HSID, SSID)")
 
-            # PASO 5: Generar el diccionario storage_state
-            # -----------------------------------------------------------------
-            storage_state = generar_storage_state(cookies, perfil.name, nombre_bonito)
-
-            # Si es dry-run, mostrar qué se escribiría y salir
-            if args.dry_run:
-                print("\n[dry-run] No se escribe archivo")
-                print(f"\nContenido que se escribiría en {args.output}:")
-                # [:500] muestra solo los primeros 500 caracteres
-                print(json.dumps(storage_state, indent=2)[:500] + "...")
-            else:
-                # PASO 6: Escribir el archivo JSON
-                # -------------------------------------------------------------
-                output_path = Path(args.output)
-                # Crear directorio padre si no existe
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-
-                # Hacer backup del archivo existente (por seguridad)
-                if output_path.exists():
-                    backup = output_path.with_suffix('.json.bak')
-                    shutil.copy2(output_path, backup)
-                    print(f"\n  Backup creado: {backup}")
-
-                # Escribir el JSON con indentación para legibilidad
-                with open(output_path, 'w') as f:
-                    json.dump(storage_state, f, indent=2)
-
-                # Establecer permisos restrictivos (solo el dueño puede leer/escribir)
-                # 0o600 = rw------- en notación octal
-                output_path.chmod(0o600)
-
-                print(f"\n✓ Archivo generado: {output_path}")
-                print(f"  Cookies: {len(cookies)}")
-
-                print("\nPrueba la autenticación con:")
-                print("  notebooklm auth check --test")
-
-        finally:
-            # LIMPIEZA: Eliminar el archivo temporal
+        # PASO 5: Generar el diccionario storage_state
+        # ---------------------------------------------------------------------
+        storage_state = generar_storage_state(cookies, perfil.name, nombre_bonito)
+
+        # Si es dry-run, mostrar qué se escribiría y salir
+        if args.dry_run:
+            print("\n[dry-run] No se escribe archivo")
+            print(f"\nContenido que se escribiría en {args.output}:")
+            # [:500] muestra solo los primeros 500 caracteres
+            print(serializar_json(storage_state)[:500] + "...")
+        else:
+            # PASO 6: Escribir el archivo JSON
             # -----------------------------------------------------------------
-            # El bloque finally se ejecuta siempre, haya error o no
-            temp_db.unlink(missing_ok=True)  # unlink = eliminar archivo
+            output_path = Path(args.output)
+            # Crear directorio padre si no existe
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Hacer backup del archivo existente (por seguridad)
+            if output_path.exists():
+                backup = output_path.with_suffix('.json.bak')
+                shutil.copy2(output_path, backup)
+                print(f"\n  Backup creado: {backup}")
+
+            # Escribir el JSON con indentación para legibilidad. encoding='utf-8'
+            # explícito: sin él, Windows usaría la página de códigos del sistema
+            # y una ruta de perfil o cookie con caracteres no ASCII fallaría
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(serializar_json(storage_state))
+
+            # Establecer permisos restrictivos (solo el dueño puede leer/escribir)
+            # 0o600 = rw------- en notación octal
+            output_path.chmod(0o600)
+
+            print(f"\n✓ Archivo generado: {output_path}")
+            print(f"  Cookies: {len(cookies)}")
+
+            print("\nPrueba la autenticación con:")
+            print("  notebooklm auth check --test")
 
     # -------------------------------------------------------------------------
     # MANEJO DE ERRORES
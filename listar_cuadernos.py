@@ -9,6 +9,8 @@ Opciones:
     --ordenar {nombre,creacion,modificacion}  Campo de ordenación (default: nombre)
     --desc                                     Orden descendente (default: ascendente)
     --idioma CODIGO                            Filtrar por idioma de artefactos (ej: es, en)
+    --concurrencia N                           Cuadernos consultados a la vez con --idioma (default: 8)
+    --no-cache                                 Ignora la caché en disco de idiomas
 
 Ejemplos:
     python listar_cuadernos.py
@@ -22,13 +24,33 @@ Requisitos previos:
 
 import asyncio
 import argparse
+import functools
+import time
 from datetime import datetime
-
-from notebooklm import NotebookLMClient
-
-
-def formatear_fecha(fecha) -> str:
-    """Formatea una fecha para mostrar."""
+from itertools import chain
+from operator import itemgetter
+
+from common import cliente_compartido, con_reintentos, leer_cache_disco, guardar_cache_disco
+
+# ciso8601 es opcional: parsea fechas ISO 8601 en C y acepta el sufijo 'Z'.
+# Sin él se usa datetime.fromisoformat (que en Python < 3.11 no acepta 'Z')
+try:
+    from ciso8601 import parse_datetime as parsear_fecha_iso
+except ImportError:
+    def parsear_fecha_iso(texto: str) -> datetime:
+        return datetime.fromisoformat(texto.replace('Z', '+00:00'))
+
+# Caché en disco de idiomas por cuaderno: {notebook_id: {guardado, idiomas}}
+# El idioma de los artefactos casi nunca cambia; se vuelve a consultar pasado
+# TTL_CACHE_IDIOMAS (la API no da fecha de modificación con la que invalidarla
+# antes) o siempre con --no-cache
+ARCHIVO_CACHE_IDIOMAS = 'idiomas_cuadernos.json'
+TTL_CACHE_IDIOMAS = 24 * 3600
+
+
+@functools.lru_cache(maxsize=4096)
+def _formatear_fecha(fecha) -> str:
+    """Implementación memoizada de formatear_fecha (las fechas se repiten mucho)."""
     if not fecha:
         return "N/A"
     if isinstance(fecha, str):
@@ -38,75 +60,86 @@ def formatear_fecha(fecha) -> str:
     return str(fecha)
 
 
-def obtener_fecha_para_ordenar(notebook, campo: str):
-    """Obtiene el valor de fecha para ordenar."""
-    if campo == 'creacion':
-        valor = getattr(notebook, 'created_at', None) or getattr(notebook, 'create_time', None)
-    elif campo == 'modificacion':
-        valor = getattr(notebook, 'updated_at', None) or getattr(notebook, 'update_time', None)
-    else:
-        return None
+def formatear_fecha(fecha) -> str:
+    """Formatea una fecha para mostrar."""
+    try:
+        return _formatear_fecha(fecha)
+    except TypeError:
+        # Valor no hashable: no se puede memoizar, formatear directamente
+        return _formatear_fecha.__wrapped__(fecha)
+
+
+def obtener_fechas_cuaderno(notebook) -> tuple:
+    """Devuelve (creado, modificado) tal como los da la API (o None)."""
+    creado = getattr(notebook, 'created_at', None) or getattr(notebook, 'create_time', None)
+    modificado = getattr(notebook, 'updated_at', None) or getattr(notebook, 'update_time', None)
+    return creado, modificado
 
+
+def obtener_fecha_para_ordenar(valor):
+    """Convierte una fecha de obtener_fechas_cuaderno en valor para ordenar."""
     # Si es string, intentar parsear
     if isinstance(valor, str):
         try:
-            return datetime.fromisoformat(valor.replace('Z', '+00:00'))
-        except:
+            return parsear_fecha_iso(valor)
+        except ValueError:
             return valor
     return valor or datetime.min
 
 
-async def obtener_idiomas_cuaderno(client, notebook_id: str) -> dict:
-    """Obtiene los idiomas de los artefactos de un cuaderno."""
-    idiomas = {
-        'report': [],
-        'audio': [],
-    }
-
-    try:
-        # Verificar reports
-        try:
-            reports = await client.artifacts.list_reports(notebook_id)
-            if reports:
-                for report in reports:
-                    lang = getattr(report, 'language', None)
-                    if lang and lang not in idiomas['report']:
-                        idiomas['report'].append(lang)
-        except:
-            pass
-
-        # Verificar audios
-        try:
-            audios = await client.artifacts.list_audio(notebook_id)
-            if audios:
-                for audio in audios:
-                    lang = getattr(audio, 'language', None)
-                    if lang and lang not in idiomas['audio']:
-                        idiomas['audio'].append(lang)
-        except:
-            pass
-
-    except:
-        pass
+async def obtener_idiomas_cuaderno(client, notebook_id: str, cache: dict = None) -> dict:
+    """Obtiene los idiomas de los artefactos de un cuaderno.
 
-    return idiomas
+    Si se pasa cache (el dict de ARCHIVO_CACHE_IDIOMAS), se usa la entrada
+    guardada si no ha caducado, y se guarda la nueva.
+    """
+    if cache is not None:
+        entrada = cache.get(notebook_id)
+        if entrada and time.time() - entrada.get('guardado', 0) < TTL_CACHE_IDIOMAS:
+            return entrada['idiomas']
 
+    # list_reports() y list_audio() hacen cada una la misma llamada
+    # LIST_ARTIFACTS y filtran por tipo; pedimos la lista en crudo una sola
+    # vez (como verificar_artefactos_existentes en common.py) y separamos aquí
+    from notebooklm import Artifact
 
-def tiene_idioma(idiomas_cuaderno: dict, idioma_filtro: str) -> bool:
-    """Verifica si el cuaderno tiene artefactos en el idioma especificado."""
-    idioma_lower = idioma_filtro.lower()
-
-    # Verificar en reports
-    for lang in idiomas_cuaderno.get('report', []):
-        if lang and lang.lower().startswith(idioma_lower):
-            return True
-
-    # Verificar en audios
-    for lang in idiomas_cuaderno.get('audio', []):
-        if lang and lang.lower().startswith(idioma_lower):
-            return True
-
-    return False
+    try:
+        artefactos = [
+            Artifact.from_api_response(art_raw)
+            for art_raw in await con_reintentos(client.artifacts._list_raw, notebook_id)
+        ]
+    except Exception:
+        # Si se agotan los reintentos, seguir con los demás cuadernos.
+        # Sin cachear: un fallo puntual no debe ocultar los idiomas un día entero
+        return {'report': [], 'audio': []}
+
+    # Un set por tipo evita los duplicados sin buscar en la lista cada vez
+    idiomas = {'report': set(), 'audio': set()}
+    for artefacto in artefactos:
+        lang = getattr(artefacto, 'language', None)
+        destino = idiomas.get(artefacto.kind.value)
+        if lang and destino is not None:
+            # En minúsculas desde aquí, para que el filtro sea una simple
+            # comparación de prefijo sin volver a convertir en cada consulta
+            destino.add(lang.lower())
+
+    resultado = {tipo: sorted(langs) for tipo, langs in idiomas.items()}
+    if cache is not None:
+        cache[notebook_id] = {'guardado': time.time(), 'idiomas': resultado}
+    return resultado
+
+
+def tiene_idioma(idiomas_cuaderno: dict, prefijo_idioma: str) -> bool:
+    """Verifica si el cuaderno tiene artefactos en el idioma especificado.
+
+    prefijo_idioma debe venir ya en minúsculas, igual que los idiomas que
+    guarda obtener_idiomas_cuaderno.
+    """
+    # Reports primero y luego audios; any() se detiene en la primera coincidencia
+    return any(
+        lang.startswith(prefijo_idioma)
+        for lang in chain(idiomas_cuaderno.get('report', ()), idiomas_cuaderno.get('audio', ()))
+    )
 
 
 def formatear_idiomas(idiomas_cuaderno: dict) -> str:
@@ -120,11 +153,12 @@ def formatear_idiomas(idiomas_cuaderno: dict) -> str:
     return ", ".join(sorted(todos))
 
 
-async def listar_cuadernos(ordenar_por: str = 'nombre', descendente: bool = False, filtro_idioma: str = None):
+async def listar_cuadernos(ordenar_por: str = 'nombre', descendente: bool = False, filtro_idioma: str = None,
+                           concurrencia: int = 8, usar_cache: bool = True):
     """Lista todos los cuadernos con la ordenación especificada."""
 
     print("Conectando con NotebookLM...")
-    async with await NotebookLMClient.from_storage() as client:
+    async with cliente_compartido() as client:
         print("Obteniendo lista de cuadernos...")
         notebooks = await client.notebooks.list()
 
@@ -138,12 +172,43 @@ async def listar_cuadernos(ordenar_por: str = 'nombre', descendente: bool = Fals
             print(f"Filtrando por idioma: {filtro_idioma}")
             print("Verificando idiomas de artefactos (esto puede tardar)...")
 
-            for nb in notebooks:
-                nb_id = getattr(nb, 'id', None)
-                if nb_id:
-                    idiomas = await obtener_idiomas_cuaderno(client, nb_id)
-                    if tiene_idioma(idiomas, filtro_idioma):
-                        notebooks_con_info.append((nb, idiomas))
+            # Consultar los cuadernos en paralelo, como máximo 'concurrencia' a la vez
+            # para no provocar límites de tasa de la API
+            semaforo = asyncio.Semaphore(concurrencia)
+            prefijo_idioma = filtro_idioma.lower()
+            cache = leer_cache_disco(ARCHIVO_CACHE_IDIOMAS) if usar_cache else None
+
+            async def idiomas_de(posicion, nb):
+                async with semaforo:
+                    return posicion, nb, await obtener_idiomas_cuaderno(client, nb.id, cache)
+
+            con_id = [nb for nb in notebooks if getattr(nb, 'id', None)]
+            resultados = [None] * len(con_id)
+            coincidencias = 0
+
+            # as_completed entrega cada consulta en cuanto termina, así se ve el
+            # avance desde el primer resultado en vez de esperar a todas.
+            # La posición original se conserva para no alterar el orden final.
+            tareas = [asyncio.create_task(idiomas_de(posicion, nb)) for posicion, nb in enumerate(con_id)]
+            try:
+                for hechas, consulta in enumerate(asyncio.as_completed(tareas), 1):
+                    posicion, nb, idiomas = await consulta
+                    resultados[posicion] = (nb, idiomas)
+                    coincidencias += tiene_idioma(idiomas, prefijo_idioma)
+                    print(f"\r  Verificados {hechas}/{len(con_id)} cuadernos "
+                          f"({coincidencias} con idioma '{filtro_idioma}')", end='', flush=True)
+            finally:
+                # Si algo interrumpe el bucle (error inesperado, Ctrl-C), cancelar
+                # las consultas pendientes en vez de dejarlas trabajando
+                for tarea in tareas:
+                    tarea.cancel()
+            print()
+            if cache is not None:
+                guardar_cache_disco(ARCHIVO_CACHE_IDIOMAS, cache)
+            notebooks_con_info = [
+                (nb, idiomas) for nb, idiomas in resultados
+                if tiene_idioma(idiomas, prefijo_idioma)
+            ]
         else:
             # Sin filtro, incluir todos (sin verificar idiomas para mayor velocidad)
             notebooks_con_info = [(nb, None) for nb in notebooks]
@@ -153,62 +218,59 @@ async def listar_cuadernos(ordenar_por: str = 'nombre', descendente: bool = Fals
             return
 
         # Ordenar según el criterio
-        if ordenar_por == 'nombre':
-            notebooks_ordenados = sorted(
-                notebooks_con_info,
-                key=lambda x: (getattr(x[0], 'title', '') or '').lower(),
-                reverse=descendente
-            )
-        elif ordenar_por == 'creacion':
-            notebooks_ordenados = sorted(
-                notebooks_con_info,
-                key=lambda x: obtener_fecha_para_ordenar(x[0], 'creacion'),
-                reverse=descendente
-            )
-        elif ordenar_por == 'modificacion':
-            notebooks_ordenados = sorted(
-                notebooks_con_info,
-                key=lambda x: obtener_fecha_para_ordenar(x[0], 'modificacion'),
-                reverse=descendente
-            )
-        else:
-            notebooks_ordenados = notebooks_con_info
+        # Se calcula la clave de cada cuaderno una sola vez (decorar), se ordena
+        # por ella y se conserva el resto de la tupla para mostrar: las fechas
+        # se leen y se parsean una sola vez por cuaderno
+        decorados = []
+        for nb, idiomas in notebooks_con_info:
+            creado, modificado = obtener_fechas_cuaderno(nb)
+            if ordenar_por == 'creacion':
+                clave = obtener_fecha_para_ordenar(creado)
+            elif ordenar_por == 'modificacion':
+                clave = obtener_fecha_para_ordenar(modificado)
+            else:
+                clave = (getattr(nb, 'title', '') or '').lower()
+            decorados.append((clave, nb, idiomas, creado, modificado))
+        decorados.sort(key=itemgetter(0), reverse=descendente)
+
+        # Construir toda la salida en una lista y escribirla de una vez:
+        # con cientos de cuadernos se evitan miles de escrituras a la terminal
+        lineas = []
+        salida = lineas.append
 
         # Mostrar encabezado
         orden_texto = "descendente" if descendente else "ascendente"
-        print(f"\n{'='*80}")
+        salida(f"\n{'='*80}")
         if filtro_idioma:
-            print(f"CUADERNOS CON IDIOMA '{filtro_idioma.upper()}' ({len(notebooks_ordenados)} de {len(notebooks)} total)")
+            salida(f"CUADERNOS CON IDIOMA '{filtro_idioma.upper()}' ({len(decorados)} de {len(notebooks)} total)")
         else:
-            print(f"CUADERNOS DISPONIBLES ({len(notebooks)} total)")
-        print(f"Ordenados por: {ordenar_por} ({orden_texto})")
-        print(f"{'='*80}\n")
+            salida(f"CUADERNOS DISPONIBLES ({len(notebooks)} total)")
+        salida(f"Ordenados por: {ordenar_por} ({orden_texto})")
+        salida(f"{'='*80}\n")
 
-        # Mostrar cada cuaderno
-        for i, (nb, idiomas) in enumerate(notebooks_ordenados, 1):
+        # Mostrar cada cuaderno (las fechas vienen ya leídas en la tupla decorada)
+        for i, (_, nb, idiomas, creado, modificado) in enumerate(decorados, 1):
             titulo = getattr(nb, 'title', 'Sin título') or 'Sin título'
             nb_id = getattr(nb, 'id', 'N/A')
 
-            # Intentar obtener fechas
-            creado = getattr(nb, 'created_at', None) or getattr(nb, 'create_time', None)
-            modificado = getattr(nb, 'updated_at', None) or getattr(nb, 'update_time', None)
-
-            print(f"{i:3}. {titulo}")
-            print(f"     ID: {nb_id}")
-            print(f"     URL: https://notebooklm.google.com/notebook/{nb_id}")
+            salida(f"{i:3}. {titulo}")
+            salida(f"     ID: {nb_id}")
+            salida(f"     URL: https://notebooklm.google.com/notebook/{nb_id}")
             if creado:
-                print(f"     Creado: {formatear_fecha(creado)}")
+                salida(f"     Creado: {formatear_fecha(creado)}")
             if modificado:
-                print(f"     Modificado: {formatear_fecha(modificado)}")
+                salida(f"     Modificado: {formatear_fecha(modificado)}")
             if idiomas:
-                print(f"     Idiomas: {formatear_idiomas(idiomas)}")
-            print()
+                salida(f"     Idiomas: {formatear_idiomas(idiomas)}")
+            salida("")
 
-        print(f"{'='*80}")
+        salida(f"{'='*80}")
         if filtro_idioma:
-            print(f"Total: {len(notebooks_ordenados)} cuaderno(s) con idioma '{filtro_idioma}'")
+            salida(f"Total: {len(decorados)} cuaderno(s) con idioma '{filtro_idioma}'")
         else:
-            print(f"Total: {len(notebooks)} cuaderno(s)")
+            salida(f"Total: {len(notebooks)} cuaderno(s)")
+
+        print("\n".join(lineas))
 
 
 def main():
@@ -223,6 +285,8 @@ Ejemplos:
   python listar_cuadernos.py --ordenar creacion --desc # Más recientes primero
   python listar_cuadernos.py --idioma es               # Solo con artefactos en español
   python listar_cuadernos.py --idioma en --desc        # Solo en inglés, orden desc
+  python listar_cuadernos.py --idioma es --concurrencia 4  # Menos consultas simultáneas
+  python listar_cuadernos.py --idioma es --no-cache    # Volver a consultar todos los idiomas
         '''
     )
     parser.add_argument(
@@ -240,11 +304,25 @@ Ejemplos:
         '--idioma',
         help='Filtrar por idioma de artefactos (ej: es, en)'
     )
+    parser.add_argument(
+        '--concurrencia',
+        type=int,
+        default=8,
+        help='Cuadernos consultados a la vez al filtrar por idioma (default: 8)'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='No usar la caché en disco de idiomas de cuadernos'
+    )
 
     args = parser.parse_args()
 
     try:
-        asyncio.run(listar_cuadernos(args.ordenar, args.desc, args.idioma))
+        asyncio.run(listar_cuadernos(args.ordenar, args.desc, args.idioma, max(1, args.concurrencia),
+                                     not args.no_cache))
+    except KeyboardInterrupt:
+        print("\nCancelado por el usuario.")
     except Exception as e:
         print(f"\nError: {e}")
         print("\n¿Has ejecutado 'notebooklm login' para autenticarte?")
@@ -3,12 +3,17 @@
 Aplicación para crear cuadernos en NotebookLM desde vídeos de YouTube.
 
 Uso:
-    python main.py <URL_YOUTUBE> [opciones]
+    python main.py <URL_YOUTUBE> [<URL_YOUTUBE> ...] [opciones]
+    python main.py --archivo-urls urls.txt [opciones]
 
 Opciones generales:
     --mostrar-informe      Muestra el contenido del informe por pantalla
     --mostrar-descripcion  Muestra la descripción del vídeo de YouTube
     --idioma CODIGO        Idioma para el audio (default: es)
+    --no-cache             No usar la caché en disco de metadatos del vídeo
+    --archivo-urls ARCHIVO Procesa en lote las URLs del archivo (una por línea; - = stdin)
+    --concurrencia N       Vídeos procesados a la vez con varias URLs (default: 4)
+    --max-generaciones N   Artefactos generándose a la vez, en total (default: 4)
     --debug                Activa el modo debug con trazas detalladas
 
 Opciones de artefactos:
@@ -38,15 +43,18 @@ Requisitos previos:
     3. notebooklm login  (autenticarse con cuenta de Google)
 """
 
+from __future__ import annotations
+
 import asyncio
 import sys
-import re
 import argparse
-from urllib.parse import urlparse, parse_qs
-from datetime import datetime
-
-import yt_dlp
-from notebooklm import NotebookLMClient
+import functools
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
 
 from common import (
     debug, set_debug, timestamp,
@@ -56,37 +64,131 @@ from common import (
     mostrar_informe,
     mostrar_estado_artefactos,
     console,
+    estado_consola,
+    cliente_compartido,
+    leer_cache_disco,
+    guardar_cache_disco,
+    con_reintentos,
+    limitar_generaciones,
+    salida_agrupada,
+    salida_de_tarea,
 )
 
+if TYPE_CHECKING:
+    from notebooklm import NotebookLMClient
+
 # Versión del programa
 VERSION = "0.8.0"
 
+# URL de un vídeo de YouTube (watch?v=, embed/ o youtu.be/) -> video_id de 11 caracteres
+# Esquema y host no distinguen mayúsculas (como urlparse().hostname); el id sí
+_PATRON_VIDEO_ID = re.compile(
+    r'(?:(?i:https?://(?:(?:www|m)\.)?youtube\.com)/(?:watch\?(?:[^#]*&)?v=|embed/)'
+    r'|(?i:https?://youtu\.be)/)'
+    r'([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])'
+)
 
+# Vídeos procesados a la vez en un lote (valor por defecto de --concurrencia)
+CONCURRENCIA_VIDEOS = 4
+
+# Segundos durante los que se reutilizan los metadatos de un vídeo guardados en disco
+TTL_CACHE_METADATOS = 24 * 3600
+
+# Caracteres problemáticos en nombres de cuaderno: se eliminan
+_TABLA_LIMPIAR_TEXTO = str.maketrans('', '', '<>:"/\\|?*')
+
+
+@functools.lru_cache(maxsize=1024)
 def extraer_video_id(url: str) -> str | None:
     """Extrae el video_id de una URL de YouTube."""
-    # Patrones soportados:
+    # Patrones soportados (ver _PATRON_VIDEO_ID):
     # - https://www.youtube.com/watch?v=VIDEO_ID
     # - https://youtu.be/VIDEO_ID
     # - https://www.youtube.com/embed/VIDEO_ID
+    coincidencia = _PATRON_VIDEO_ID.match(url)
+    return coincidencia.group(1) if coincidencia else None
 
-    parsed = urlparse(url)
-
-    if parsed.hostname in ('www.youtube.com', 'youtube.com'):
-        if parsed.path == '/watch':
-            query = parse_qs(parsed.query)
-            return query.get('v', [None])[0]
-        elif parsed.path.startswith('/embed/'):
-            return parsed.path.split('/')[2]
-    elif parsed.hostname == 'youtu.be':
-        return parsed.path[1:]
 
-    return None
+def obtener_metadatos_video(url: str, usar_cache: bool = True) -> dict:
+    """Obtiene los metadatos del vídeo, desde la caché en disco, la API de YouTube o yt-dlp.
 
+    Los metadatos se guardan en DIRECTORIO_CACHE/metadatos_<video_id>.json y se
+    reutilizan durante TTL_CACHE_METADATOS (título o descripción pueden cambiar);
+    con usar_cache=False se consulta siempre YouTube (y se refresca la caché).
+    Si la variable de entorno YT_API_KEY tiene una clave de la YouTube Data API,
+    se prueba primero con ella; si falla, se usa yt-dlp.
+    """
+    video_id = extraer_video_id(url)
+    archivo_cache = f"metadatos_{video_id}.json"
+    if usar_cache and video_id:
+        entrada = leer_cache_disco(archivo_cache)
+        metadatos = entrada.get('metadatos')
+        if (isinstance(metadatos, dict) and metadatos.get('video_id') == video_id
+                and time.time() - entrada.get('guardado', 0) < TTL_CACHE_METADATOS):
+            debug("Metadatos leídos de la caché: %s", archivo_cache)
+            return metadatos
+
+    clave_api = os.environ.get('YT_API_KEY')
+    metadatos = _extraer_metadatos_api(video_id, clave_api) if clave_api and video_id else None
+    if metadatos is None:
+        metadatos = dict(_extraer_metadatos_ytdlp(url))
+    # Nunca se guardan en disco metadatos incompletos (valores por defecto)
+    if video_id and metadatos['video_id'] == video_id and _metadatos_completos(metadatos):
+        guardar_cache_disco(archivo_cache, {'guardado': time.time(), 'metadatos': metadatos})
+    return metadatos
+
+
+def _metadatos_completos(metadatos: dict) -> bool:
+    """True si título, canal y fecha son reales y no los valores por defecto."""
+    return (metadatos.get('titulo') not in ('', 'Sin título')
+            and metadatos.get('canal') not in ('', 'Canal desconocido')
+            and metadatos.get('fecha') != 'fecha-desconocida')
+
+
+def _extraer_metadatos_api(video_id: str, clave_api: str) -> dict | None:
+    """Obtiene los metadatos con la YouTube Data API (videos.list), o None si falla.
+
+    Es una sola petición HTTPS de unos cientos de milisegundos, frente a los
+    segundos que tarda yt-dlp en cargar la página del vídeo.
+    """
+    import httpx  # Ya lo instala notebooklm-py
 
-def obtener_metadatos_video(url: str) -> dict:
-    """Extrae metadatos del vídeo de YouTube usando yt-dlp."""
+    debug("Consultando la YouTube Data API para %s", video_id)
+    try:
+        # La clave va en una cabecera y no en la URL, que aparece en los mensajes de error
+        respuesta = httpx.get('https://www.googleapis.com/youtube/v3/videos',
+                              params={'part': 'snippet', 'id': video_id},
+                              headers={'X-Goog-Api-Key': clave_api},
+                              timeout=5.0)
+        respuesta.raise_for_status()
+        snippet = respuesta.json()['items'][0]['snippet']
+    except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+        # La clave no es válida, se agotó la cuota o el vídeo no existe: probar con yt-dlp
+        # Solo el tipo de error y el código HTTP: nunca str(e), que incluye la petición
+        codigo = getattr(getattr(e, 'response', None), 'status_code', None)
+        debug("  YouTube Data API no disponible (%s%s), se usará yt-dlp",
+              type(e).__name__, f" {codigo}" if codigo else '')
+        return None
+
+    metadatos = {
+        'titulo': snippet.get('title') or 'Sin título',
+        'canal': snippet.get('channelTitle') or 'Canal desconocido',
+        # publishedAt: '2024-01-31T17:00:00Z' (UTC, como el timestamp de yt-dlp)
+        'fecha': snippet.get('publishedAt', '')[:10] or 'fecha-desconocida',
+        'video_id': video_id,
+        'descripcion': snippet.get('description', ''),
+    }
+    debug("Metadatos extraídos (API): %s", metadatos)
+    return metadatos
+
+
+@functools.lru_cache(maxsize=256)
+def _extraer_metadatos_ytdlp(url: str) -> dict:
+    """Extrae metadatos del vídeo de YouTube usando yt-dlp (memorizado por URL)."""
+    # yt-dlp carga decenas de extractores al importarse: solo se paga si hay que usarlo
+    import yt_dlp
     from common import DEBUG
-    debug(f"Iniciando extracción de metadatos para: {url}")
+    debug("Iniciando extracción de metadatos para: %s", url)
 
     # Configurar yt-dlp según modo debug
     if DEBUG:
@@ -95,6 +197,7 @@ def obtener_metadatos_video(url: str) -> dict:
             'no_warnings': False,
             'extract_flat': False,
             'verbose': True,
+            'skip_download': True,
         }
     else:
         ydl_opts = {
@@ -103,38 +206,89 @@ def obtener_metadatos_video(url: str) -> dict:
             'extract_flat': False,
             # Ignorar errores HTTP no críticos (como 403 en algunas peticiones)
             'ignoreerrors': False,
+            'skip_download': True,
         }
 
-    debug(f"Opciones de yt-dlp: {ydl_opts}")
+    # Solo se leen metadatos: no hace falta descifrar firmas (JS del reproductor),
+    # ni pedir configuraciones extra de clientes, ni los manifiestos DASH/HLS.
+    # noplaylist: con una URL watch?v=...&list=... se extrae solo el vídeo, no
+    # la lista entera (que además daría título y canal de la lista)
+    ydl_opts.update({
+        'noplaylist': True,
+        'youtube_include_dash_manifest': False,
+        'youtube_include_hls_manifest': False,
+        'extractor_args': {'youtube': {'player_skip': ['configs', 'js']}},
+        # Si hay que recurrir al procesado completo, que no falle por no haber formatos
+        'ignore_no_formats_error': True,
+    })
+
+    debug("Opciones de yt-dlp: %s", ydl_opts)
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         debug("Ejecutando yt-dlp.extract_info()...")
-        info = ydl.extract_info(url, download=False)
-        debug(f"Extracción completada. Claves disponibles: {list(info.keys()) if info else 'None'}")
-
-        # Extraer fecha de subida (formato YYYYMMDD)
-        upload_date = info.get('upload_date', '')
-        debug(f"upload_date raw: {upload_date}")
-        if upload_date:
-            fecha = datetime.strptime(upload_date, '%Y%m%d').strftime('%Y-%m-%d')
+        # process=False: solo el InfoDict del extractor, sin la fase de
+        # procesado (selección de formatos, subtítulos...) que aquí no se usa
+        info = ydl.extract_info(url, download=False, process=False)
+        # Algunas URLs (p. ej. watch?v=...&list=...) las atiende YoutubeTab, que sin
+        # procesado solo devuelve un enlace al vídeo (_type 'url'): resolverlo
+        if info and info.get('_type') in ('url', 'url_transparent') and info.get('url'):
+            debug("yt-dlp devolvió un enlace (%s): resolviendo %s", info['_type'], info['url'])
+            info = ydl.extract_info(info['url'], download=False, process=False,
+                                    ie_key=info.get('ie_key'))
+        # Si aun así faltan título o fecha, recurrir al procesado completo
+        if not info or not info.get('title') or not (info.get('upload_date') or info.get('timestamp')):
+            debug("Faltan campos sin procesado: extracción completa de %s", url)
+            info = ydl.extract_info(url, download=False) or {}
+        if DEBUG:
+            debug("Extracción completada. Claves disponibles: %s", list(info.keys()) if info else 'None')
+
+        # Extraer fecha de subida (formato YYYYMMDD). Sin procesado, yt-dlp
+        # no la deriva del timestamp: hacerlo aquí si el extractor no la dio
+        # yt-dlp puede incluir la clave con valor None si no sabe la fecha
+        upload_date = info.get('upload_date') or ''
+        timestamp_subida = info.get('timestamp')
+        debug("upload_date raw: %s, timestamp: %s", upload_date, timestamp_subida)
+        if len(upload_date) == 8 and upload_date.isdigit():
+            fecha = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
+        elif timestamp_subida:
+            fecha = datetime.fromtimestamp(timestamp_subida, timezone.utc).strftime('%Y-%m-%d')
         else:
             fecha = 'fecha-desconocida'
 
         metadatos = {
-            'titulo': info.get('title', 'Sin título'),
-            'canal': info.get('channel', info.get('uploader', 'Canal desconocido')),
+            'titulo': info.get('title') or 'Sin título',
+            'canal': info.get('channel') or info.get('uploader') or 'Canal desconocido',
             'fecha': fecha,
-            'video_id': info.get('id', ''),
-            'descripcion': info.get('description', ''),
+            'video_id': info.get('id') or '',
+            'descripcion': info.get('description') or '',
         }
-        debug(f"Metadatos extraídos: {metadatos}")
+        debug("Metadatos extraídos: %s", metadatos)
         return metadatos
 
 
+# Extracciones de metadatos lanzadas en esta ejecución: (url, usar_cache) -> tarea
+_tareas_metadatos: dict[tuple[str, bool], asyncio.Future] = {}
+
+
+async def obtener_metadatos_async(url: str, usar_cache: bool = True) -> dict:
+    """Obtiene los metadatos del vídeo en un hilo, sin bloquear el bucle de eventos.
+
+    La extracción de cada URL se lanza una sola vez por ejecución: las llamadas
+    repetidas con la misma URL (p. ej. en un lote) esperan a la misma tarea en
+    vez de repetirla.
+    """
+    clave = (url, usar_cache)
+    tarea = _tareas_metadatos.get(clave)
+    if tarea is None:
+        tarea = asyncio.ensure_future(asyncio.to_thread(obtener_metadatos_video, url, usar_cache))
+        _tareas_metadatos[clave] = tarea
+    return await tarea
+
+
 def limpiar_texto(texto: str, max_length: int = 50) -> str:
     """Limpia texto para usar en nombre de cuaderno."""
     # Eliminar caracteres problemáticos
-    texto = re.sub(r'[<>:"/\\|?*]', '', texto)
+    texto = texto.translate(_TABLA_LIMPIAR_TEXTO)
     # Truncar si es muy largo
     if len(texto) > max_length:
         texto = texto[:max_length].rsplit(' ', 1)[0] + '...'
@@ -151,46 +305,116 @@ def generar_nombre_cuaderno(metadatos: dict) -> str:
     return f"YT-{video_id} - {titulo} - {fecha} - {canal}"
 
 
-async def buscar_cuaderno_existente(client: NotebookLMClient, video_id: str):
-    """Busca si ya existe un cuaderno para este video_id."""
-    debug(f"Buscando cuaderno con prefijo YT-{video_id}")
+# Índice {"YT-<video_id>": cuaderno}; se lista una sola vez por ejecución
+_indice_cuadernos: asyncio.Future | None = None
+
+
+async def _construir_indice_cuadernos(client: NotebookLMClient) -> dict:
+    """Lista los cuadernos y los indexa por el prefijo "YT-<video_id>" del título."""
     notebooks = await client.notebooks.list()
-    debug(f"Cuadernos encontrados: {len(notebooks)}")
-    prefijo = f"YT-{video_id}"
+    debug("Cuadernos encontrados: %d", len(notebooks))
+    indice = {}
     for nb in notebooks:
-        debug(f"  Comparando: '{nb.title}' con prefijo '{prefijo}'")
-        if nb.title.startswith(prefijo):
-            debug(f"  ✓ Coincidencia encontrada: {nb.id}")
-            return nb
-    debug("  No se encontró cuaderno existente")
-    return None
+        # El nombre es "YT-ID - Título - Fecha - Canal": la clave es lo anterior al primer " - "
+        if nb.title.startswith('YT-'):
+            indice.setdefault(nb.title.split(' - ', 1)[0], nb)
+    return indice
 
 
-async def procesar_video(url: str, mostrar_informe_flag: bool = False, idioma: str = 'es',
-                         timeout_fuente: float = 60.0, retardo: float = 3.0,
-                         mostrar_descripcion: bool = False,
-                         artefactos_solicitados: set = None):
-    """Procesa un vídeo de YouTube: crea cuaderno y genera artefactos.
+def precargar_indice_cuadernos(client: NotebookLMClient):
+    """Empieza a listar los cuadernos en segundo plano, sin esperar al resultado."""
+    global _indice_cuadernos
+    if _indice_cuadernos is None:
+        _indice_cuadernos = asyncio.ensure_future(_construir_indice_cuadernos(client))
+        # Marca el error como consultado aunque nadie llegue a esperar el listado
+        _indice_cuadernos.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+
+async def obtener_indice_cuadernos(client: NotebookLMClient) -> dict:
+    """Devuelve el índice de cuadernos por vídeo, listándolos solo la primera vez.
+
+    Las llamadas concurrentes (varios vídeos a la vez) comparten el mismo listado.
+    """
+    global _indice_cuadernos
+    precargar_indice_cuadernos(client)
+    try:
+        return await asyncio.shield(_indice_cuadernos)
+    except Exception:
+        # No conservar un listado fallido: la siguiente llamada lo reintenta
+        _indice_cuadernos = None
+        raise
+
+
+async def buscar_cuaderno_existente(client: NotebookLMClient, video_id: str):
+    """Busca si ya existe un cuaderno para este video_id."""
+    debug("Buscando cuaderno con prefijo YT-%s", video_id)
+    notebook = (await obtener_indice_cuadernos(client)).get(f"YT-{video_id}")
+    if notebook:
+        debug("  ✓ Coincidencia encontrada: %s", notebook.id)
+    else:
+        debug("  No se encontró cuaderno existente")
+    return notebook
+
+
+async def _anadir_fuente_una_vez(client: NotebookLMClient, notebook_id: str, url: str):
+    """Añade la URL sin esperar a que se procese, desenvolviendo los límites de tasa.
+
+    add_url envuelve cualquier error RPC en SourceAddError; se relanza la causa
+    si es un 429 para que con_reintentos la reconozca (y respete su retry_after).
+    Los demás errores salen tal cual.
+    """
+    from notebooklm.exceptions import RateLimitError, SourceAddError
+    try:
+        return await client.sources.add_url(notebook_id, url)
+    except SourceAddError as e:
+        if isinstance(e.__cause__, RateLimitError):
+            raise e.__cause__ from e
+        raise
+
+
+async def anadir_fuente(client: NotebookLMClient, notebook_id: str, url: str):
+    """Añade el vídeo como fuente con hasta 3 intentos ante límites de tasa (429).
+
+    Solo se reintenta un 429, que el servidor rechaza sin crear nada; un 5xx o un
+    error de red pueden llegar con la fuente ya creada y reintentar la duplicaría
+    (el mismo criterio que en generar_artefactos). La espera a que la fuente
+    termine de procesarse va aparte por el mismo motivo.
+    """
+    from notebooklm.exceptions import RateLimitError
+    return await con_reintentos(_anadir_fuente_una_vez, client, notebook_id, url,
+                                intentos=3, espera_inicial=2.0, espera_maxima=16.0,
+                                errores=(RateLimitError,))
+
+
+async def procesar_video_impl(client: NotebookLMClient, url: str, mostrar_informe_flag: bool = False,
+                              idioma: str = 'es', timeout_fuente: float = 60.0, retardo: float = 3.0,
+                              mostrar_descripcion: bool = False,
+                              artefactos_solicitados: tuple = None,
+                              usar_cache: bool = True):
+    """Procesa un vídeo de YouTube con un cliente ya abierto: crea cuaderno y genera artefactos.
 
     Args:
+        client: Cliente de NotebookLM abierto por quien llama
         url: URL del vídeo de YouTube
         mostrar_informe_flag: Si True, muestra el contenido del informe
         idioma: Código de idioma para los artefactos
         timeout_fuente: Segundos máx. para esperar procesamiento de fuente
         retardo: Segundos de retardo entre inicio de cada generación
         mostrar_descripcion: Si True, muestra la descripción del vídeo
-        artefactos_solicitados: Conjunto de tipos de artefactos a generar
+        artefactos_solicitados: Tipos de artefactos a generar, en orden de generación
+            (main() los ordena una sola vez según ORDEN_ARTEFACTOS)
+        usar_cache: Si False, ignora la caché en disco de metadatos del vídeo
     """
     # Por defecto: informe, mapa mental, tabla de datos, cuestionario y tarjetas
     if artefactos_solicitados is None:
-        artefactos_solicitados = {'report', 'mind_map', 'data_table', 'quiz', 'flashcards'}
+        artefactos_solicitados = ('report', 'mind_map', 'data_table', 'quiz', 'flashcards')
     debug("="*60)
-    debug("INICIO procesar_video()")
-    debug(f"  URL: {url}")
-    debug(f"  mostrar_informe: {mostrar_informe_flag}")
-    debug(f"  idioma: {idioma}")
-    debug(f"  timeout_fuente: {timeout_fuente}s")
-    debug(f"  retardo: {retardo}s")
+    debug("INICIO procesar_video_impl()")
+    debug("  URL: %s", url)
+    debug("  mostrar_informe: %s", mostrar_informe_flag)
+    debug("  idioma: %s", idioma)
+    debug("  timeout_fuente: %ss", timeout_fuente)
+    debug("  retardo: %ss", retardo)
     debug("="*60)
 
     # 1. Validar URL y extraer video_id
@@ -198,151 +422,224 @@ async def procesar_video(url: str, mostrar_informe_flag: bool = False, idioma: s
     video_id = extraer_video_id(url)
     if not video_id:
         console.print(f"[bold red]Error: URL no válida de YouTube: {url}[/bold red]")
-        debug(f"  Fallo: no se pudo extraer video_id de {url}")
+        debug("  Fallo: no se pudo extraer video_id de %s", url)
         return False
 
     console.print(f"Video ID: [bold]{video_id}[/bold]")
     console.print(f"Idioma para contenido: [bold]{idioma}[/bold]")
-    debug(f"  video_id extraído: {video_id}")
+    debug("  video_id extraído: %s", video_id)
+
+    # 2. Verificar si ya existe el cuaderno (el cliente ya viene abierto)
+    debug("PASO 2: Verificar si ya existe el cuaderno")
+    print(f"Buscando cuaderno existente para: {video_id}")
+    notebook = await buscar_cuaderno_existente(client, video_id)
+
+    # 3. Obtener metadatos del vídeo: solo hacen falta para crear el cuaderno
+    # (nombre) o para mostrar la descripción; un cuaderno existente no los necesita
+    metadatos = None
+    if notebook is None or mostrar_descripcion:
+        debug("PASO 3: Obtener metadatos del vídeo con yt-dlp")
+        console.print("[cyan]Obteniendo metadatos del vídeo...[/cyan]")
+        try:
+            # yt-dlp hace E/S de red bloqueante: se ejecuta en un hilo para no
+            # detener el bucle de eventos (puede que ya esté en marcha o terminada)
+            metadatos = await obtener_metadatos_async(url, usar_cache)
+            console.print(f"  Título: [bold]{metadatos['titulo']}[/bold]")
+            console.print(f"  Canal: [dim]{metadatos['canal']}[/dim]")
+            console.print(f"  Fecha: [dim]{metadatos['fecha']}[/dim]")
+            debug("  Metadatos obtenidos correctamente")
+
+            # Mostrar descripción si se solicita
+            if mostrar_descripcion and metadatos.get('descripcion'):
+                console.print("\n" + "="*60, style="dim")
+                console.print("[bold]DESCRIPCIÓN DEL VÍDEO[/bold]")
+                console.print("="*60, style="dim")
+                console.print(metadatos['descripcion'])
+                console.print("="*60 + "\n", style="dim")
+        except Exception as e:
+            print(f"Error obteniendo metadatos: {e}")
+            debug("  Excepción en metadatos: %s: %s", type(e).__name__, e)
+            return False
+
+        nombre_cuaderno = generar_nombre_cuaderno(metadatos)
+        debug("  Nombre de cuaderno generado: %s", nombre_cuaderno)
+
+    if notebook:
+        debug("  Cuaderno encontrado, procesando como existente")
+        console.print(f"[bold green]✓ Cuaderno ya existe:[/bold green] {notebook.title}")
+        console.print(f"  ID: {notebook.id}")
+        console.print(f"  URL: https://notebooklm.google.com/notebook/{notebook.id}")
+
+        # Verificar artefactos existentes (considerando idioma)
+        debug("PASO 4.1: Verificar artefactos existentes")
+        print(f"\nVerificando artefactos existentes (idioma: {idioma})...")
+        existentes, urls = await verificar_artefactos_existentes(client, notebook.id, idioma)
+
+        # Mostrar estado de cada artefacto
+        faltantes, faltantes_con_limite = mostrar_estado_artefactos(existentes, urls, notebook.id)
+
+        # Repartir los faltantes en una sola pasada: a generar (solicitados) o a sugerir
+        a_generar, faltantes_no_solicitados = [], []
+        for tipo in faltantes:
+            (a_generar if tipo in artefactos_solicitados else faltantes_no_solicitados).append(tipo)
+
+        # Generar los solicitados que faltan
+        if a_generar:
+            print(f"\nGenerando {len(a_generar)} artefacto(s)...")
+            exitosos = await generar_artefactos(client, notebook.id, a_generar, idioma, retardo)
+            print(f"\n  Artefactos generados: {exitosos}/{len(a_generar)}")
+        elif faltantes:
+            # Hay faltantes pero no se solicitaron
+            print(f"\n  No se generaron artefactos (no solicitados)")
+        else:
+            console.print("\n[green]✓ Todos los artefactos ya están disponibles[/green]")
+
+        # Mostrar sugerencias para artefactos faltantes no solicitados
+        if faltantes_no_solicitados:
+            print("\nPara generar artefactos faltantes, usa:")
+            opciones = [f"--{tipo}" for tipo in faltantes_no_solicitados]
+            print(f"  python main.py \"{url}\" {' '.join(opciones)}")
+
+        # Mostrar informe si se solicita
+        if mostrar_informe_flag and existentes.report:
+            await mostrar_informe(client, notebook.id)
 
-    # 2. Obtener metadatos del vídeo
-    debug("PASO 2: Obtener metadatos del vídeo con yt-dlp")
-    console.print("[cyan]Obteniendo metadatos del vídeo...[/cyan]")
+        print("\n" + "="*50)
+        print(f"  Visita NotebookLM para ver los resultados:")
+        print(f"  https://notebooklm.google.com/notebook/{notebook.id}")
+        return True
+
+    # 5. Crear nuevo cuaderno
+    debug("PASO 5: Crear nuevo cuaderno")
+    console.print(f"Creando cuaderno: [bold]{nombre_cuaderno}[/bold]")
+    notebook = await client.notebooks.create(nombre_cuaderno)
+    (await obtener_indice_cuadernos(client))[f"YT-{video_id}"] = notebook
+    notebook_url = f"https://notebooklm.google.com/notebook/{notebook.id}"
+    console.print(f"[bold green]✓ Cuaderno creado[/bold green] (ID: {notebook.id})")
+    console.print(f"  URL: {notebook_url}")
+    debug("  Cuaderno creado con ID: %s", notebook.id)
+
+    # 6. Añadir vídeo como fuente y esperar a que esté lista
+    debug("PASO 6: Añadir vídeo como fuente")
+    console.print(f"Añadiendo vídeo como fuente: [underline]{url}[/underline]")
+    
     try:
-        metadatos = obtener_metadatos_video(url)
-        console.print(f"  Título: [bold]{metadatos['titulo']}[/bold]")
-        console.print(f"  Canal: [dim]{metadatos['canal']}[/dim]")
-        console.print(f"  Fecha: [dim]{metadatos['fecha']}[/dim]")
-        debug(f"  Metadatos obtenidos correctamente")
-
-        # Mostrar descripción si se solicita
-        if mostrar_descripcion and metadatos.get('descripcion'):
-            console.print("\n" + "="*60, style="dim")
-            console.print("[bold]DESCRIPCIÓN DEL VÍDEO[/bold]")
-            console.print("="*60, style="dim")
-            console.print(metadatos['descripcion'])
-            console.print("="*60 + "\n", style="dim")
+        fuente = await anadir_fuente(client, notebook.id, url)
     except Exception as e:
-        print(f"Error obteniendo metadatos: {e}")
-        debug(f"  Excepción en metadatos: {type(e).__name__}: {e}")
+        # Sin fuente no tiene sentido generar artefactos: se detiene aquí
+        console.print(f"[bold red]Error: no se pudo añadir el vídeo como fuente: {e}[/bold red]")
+        console.print(f"  El cuaderno quedó vacío: {notebook_url}")
+        debug("  Fallo al añadir la fuente: %s: %s", type(e).__name__, e)
         return False
 
-    nombre_cuaderno = generar_nombre_cuaderno(metadatos)
-    debug(f"  Nombre de cuaderno generado: {nombre_cuaderno}")
+    try:
+        with estado_consola(f"Procesando fuente (máx. {timeout_fuente}s)...", spinner="earth"):
+            # Sondeo que empieza rápido y se espacia hasta 2s: con el máximo por
+            # defecto (10s) se podía tardar hasta 10s de más en notar que ya está lista
+            await client.sources.wait_until_ready(notebook.id, fuente.id, timeout=timeout_fuente,
+                                                  initial_interval=0.25, max_interval=2.0)
+        console.print("[bold green]✓ Fuente añadida y procesada[/bold green]")
+        debug("  Fuente añadida y lista")
+    except Exception as e:
+        console.print(f"[yellow]✓ Fuente añadida (aviso al esperar: {e})[/yellow]")
+        debug("  Fuente añadida pero error en espera: %s", e)
+
+    # 7. Generar artefactos solicitados
+    debug("PASO 7: Generar artefactos solicitados")
+    tipos_a_generar = list(artefactos_solicitados)
+    exitosos = await generar_artefactos(client, notebook.id, tipos_a_generar, idioma, retardo)
+    print(f"\n  Artefactos generados: {exitosos}/{len(tipos_a_generar)}")
+    debug("  Artefactos exitosos: %d/%d", exitosos, len(tipos_a_generar))
+
+    # Mostrar sugerencias para artefactos no solicitados
+    tipos_no_solicitados = [t for t in ORDEN_ARTEFACTOS if t not in artefactos_solicitados]
+    if tipos_no_solicitados:
+        print("\nPara generar otros artefactos, usa:")
+        opciones = [f"--{t}" for t in tipos_no_solicitados]
+        print(f"  python main.py \"{url}\" {' '.join(opciones)}")
+
+    # Mostrar informe si se solicita
+    if mostrar_informe_flag:
+        debug("PASO 8: Mostrar informe (solicitado)")
+        # generar_artefactos ya esperó a que el informe terminara: no hace falta pausa
+        await mostrar_informe(client, notebook.id)
+
+    debug("="*60)
+    debug("FIN procesar_video_impl() - Completado exitosamente")
+    debug("="*60)
+    print("\n" + "="*50)
+    print("✓ Proceso completado")
+    print(f"  Cuaderno: {nombre_cuaderno}")
+    print(f"  URL: https://notebooklm.google.com/notebook/{notebook.id}")
+
+    return True
+
 
-    # 3. Conectar con NotebookLM
-    debug("PASO 3: Conectar con NotebookLM")
+async def procesar_video(url: str, *args, **kwargs) -> bool:
+    """Procesa un vídeo abriendo (o reutilizando) el cliente de NotebookLM.
+
+    Acepta los mismos argumentos que procesar_video_impl, salvo el cliente.
+    El listado de cuadernos se pide en cuanto hay conexión, en segundo plano.
+    """
+    debug("PASO PREVIO: Conectar con NotebookLM")
     print("Conectando con NotebookLM...")
-    async with await NotebookLMClient.from_storage() as client:
+    async with cliente_compartido() as client:
         debug("  Conexión establecida con NotebookLM")
+        precargar_indice_cuadernos(client)
+        return await procesar_video_impl(client, url, *args, **kwargs)
 
-        # 4. Verificar si ya existe el cuaderno
-        debug("PASO 4: Verificar si ya existe el cuaderno")
-        print(f"Buscando cuaderno existente para: {video_id}")
-        notebook = await buscar_cuaderno_existente(client, video_id)
-
-        if notebook:
-            debug("  Cuaderno encontrado, procesando como existente")
-            console.print(f"[bold green]✓ Cuaderno ya existe:[/bold green] {notebook.title}")
-            console.print(f"  ID: {notebook.id}")
-            console.print(f"  URL: https://notebooklm.google.com/notebook/{notebook.id}")
-
-            # Verificar artefactos existentes (considerando idioma)
-            debug("PASO 4.1: Verificar artefactos existentes")
-            print(f"\nVerificando artefactos existentes (idioma: {idioma})...")
-            existentes, urls = await verificar_artefactos_existentes(client, notebook.id, idioma)
-
-            # Mostrar estado de cada artefacto
-            faltantes, faltantes_con_limite = mostrar_estado_artefactos(existentes, urls, notebook.id)
-
-            # Determinar qué artefactos generar según las opciones
-            a_generar = []
-            for tipo in faltantes:
-                if tipo in artefactos_solicitados:
-                    a_generar.append(tipo)
-
-            # Generar los solicitados que faltan
-            if a_generar:
-                print(f"\nGenerando {len(a_generar)} artefacto(s)...")
-                exitosos = await generar_artefactos(client, notebook.id, a_generar, idioma, retardo)
-                print(f"\n  Artefactos generados: {exitosos}/{len(a_generar)}")
-            elif faltantes:
-                # Hay faltantes pero no se solicitaron
-                print(f"\n  No se generaron artefactos (no solicitados)")
-            else:
-                console.print("\n[green]✓ Todos los artefactos ya están disponibles[/green]")
-
-            # Mostrar sugerencias para artefactos faltantes no solicitados
-            faltantes_no_solicitados = [t for t in faltantes if t not in artefactos_solicitados]
-            if faltantes_no_solicitados:
-                print("\nPara generar artefactos faltantes, usa:")
-                opciones = []
-                for tipo in faltantes_no_solicitados:
-                    opciones.append(f"--{tipo}")
-                print(f"  python main.py \"{url}\" {' '.join(opciones)}")
-
-            # Mostrar informe si se solicita
-            if mostrar_informe_flag and len(existentes['report']) > 0:
-                await mostrar_informe(client, notebook.id)
-
-            print("\n" + "="*50)
-            print(f"  Visita NotebookLM para ver los resultados:")
-            print(f"  https://notebooklm.google.com/notebook/{notebook.id}")
-            return True
-
-        # 5. Crear nuevo cuaderno
-        # 5. Crear nuevo cuaderno
-        debug("PASO 5: Crear nuevo cuaderno")
-        console.print(f"Creando cuaderno: [bold]{nombre_cuaderno}[/bold]")
-        notebook = await client.notebooks.create(nombre_cuaderno)
-        notebook_url = f"https://notebooklm.google.com/notebook/{notebook.id}"
-        console.print(f"[bold green]✓ Cuaderno creado[/bold green] (ID: {notebook.id})")
-        console.print(f"  URL: {notebook_url}")
-        debug(f"  Cuaderno creado con ID: {notebook.id}")
-
-        # 6. Añadir vídeo como fuente y esperar a que esté lista
-        debug("PASO 6: Añadir vídeo como fuente")
-        console.print(f"Añadiendo vídeo como fuente: [underline]{url}[/underline]")
-        
-        try:
-            with console.status(f"Procesando fuente (máx. {timeout_fuente}s)...", spinner="earth"):
-                await client.sources.add_url(notebook.id, url, wait=True, wait_timeout=timeout_fuente)
-            console.print("[bold green]✓ Fuente añadida y procesada[/bold green]")
-            debug("  Fuente añadida y lista")
-        except Exception as e:
-            console.print(f"[yellow]✓ Fuente añadida (aviso al esperar: {e})[/yellow]")
-            debug(f"  Fuente añadida pero error en espera: {e}")
-
-        # 7. Generar artefactos solicitados
-        debug("PASO 7: Generar artefactos solicitados")
-        tipos_a_generar = [t for t in ORDEN_ARTEFACTOS if t in artefactos_solicitados]
-        exitosos = await generar_artefactos(client, notebook.id, tipos_a_generar, idioma, retardo)
-        print(f"\n  Artefactos generados: {exitosos}/{len(tipos_a_generar)}")
-        debug(f"  Artefactos exitosos: {exitosos}/{len(tipos_a_generar)}")
-
-        # Mostrar sugerencias para artefactos no solicitados
-        no_solicitados = [t for t in ORDEN_ARTEFACTOS if t not in artefactos_solicitados]
-        if no_solicitados:
-            print("\nPara generar otros artefactos, usa:")
-            opciones = [f"--{t}" for t in no_solicitados]
-            print(f"  python main.py \"{url}\" {' '.join(opciones)}")
 
-        # Mostrar informe si se solicita
-        if mostrar_informe_flag:
-            debug("PASO 8: Mostrar informe (solicitado)")
-            # Esperar un poco para que el informe esté listo
-            await asyncio.sleep(2)
-            await mostrar_informe(client, notebook.id)
+async def procesar_videos(urls: list[str], *args, concurrencia: int = CONCURRENCIA_VIDEOS, **kwargs) -> list[bool]:
+    """Procesa varios vídeos con un único cliente de NotebookLM.
 
-        debug("="*60)
-        debug("FIN procesar_video() - Completado exitosamente")
-        debug("="*60)
-        print("\n" + "="*50)
-        print("✓ Proceso completado")
-        print(f"  Cuaderno: {nombre_cuaderno}")
-        print(f"  URL: https://notebooklm.google.com/notebook/{notebook.id}")
+    Todos los vídeos comparten la sesión autenticada y el pool de conexiones;
+    como mucho `concurrencia` vídeos se procesan a la vez. El resto de
+    argumentos son los de procesar_video_impl.
 
-        return True
+    Returns:
+        Lista con el resultado (True si terminó bien) de cada URL, en su orden.
+    """
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+    terminados = 0
+
+    async def procesar(client: NotebookLMClient, url: str) -> bool:
+        nonlocal terminados
+        async with semaforo:
+            console.print(f"[dim]Procesando {url}...[/dim]")
+            # La salida de cada vídeo se acumula y se muestra entera al terminar
+            with salida_de_tarea():
+                try:
+                    resultado = await procesar_video_impl(client, url, *args, **kwargs)
+                except Exception as e:
+                    # Un vídeo fallido no debe abortar el resto del lote
+                    console.print(f"[bold red]Error procesando {url}: {e}[/bold red]")
+                    debug("Excepción en %s: %s: %s", url, type(e).__name__, e)
+                    resultado = False
+            terminados += 1
+            console.print(f"\n[bold cyan]Vídeos terminados: {terminados}/{len(urls)}[/bold cyan]")
+            return resultado
+
+    debug("PASO PREVIO: Conectar con NotebookLM")
+    print("Conectando con NotebookLM...")
+    async with cliente_compartido() as client:
+        debug("  Conexión establecida con NotebookLM")
+        precargar_indice_cuadernos(client)
+        with salida_agrupada():
+            return list(await asyncio.gather(*(procesar(client, url) for url in urls)))
+
+
+def leer_archivo_urls(ruta: Path) -> list[str]:
+    """Lee un archivo con una URL por línea, ignorando líneas vacías y comentarios (#).
+
+    Con ruta '-' se leen de la entrada estándar (p. ej. `cat urls.txt | python main.py --archivo-urls -`).
+    """
+    texto = sys.stdin.read() if str(ruta) == '-' else ruta.read_text(encoding='utf-8')
+    urls = []
+    for linea in texto.splitlines():
+        linea = linea.strip()
+        if linea and not linea.startswith('#'):
+            urls.append(linea)
+    return urls
 
 
 def main():
@@ -357,11 +654,22 @@ Ejemplos:
   python main.py "https://www.youtube.com/watch?v=VIDEO_ID" --mostrar-informe
   python main.py "https://www.youtube.com/watch?v=VIDEO_ID" --idioma en
   python main.py "https://www.youtube.com/watch?v=VIDEO_ID" --debug
+  python main.py "https://youtu.be/ID_1" "https://youtu.be/ID_2" --report
+  python main.py --archivo-urls urls.txt --concurrencia 2
+  cat urls.txt | python main.py --archivo-urls -
 
 Por defecto solo genera el informe (sin límite). Use --todo para todos.
         '''
     )
-    parser.add_argument('url', help='URL del vídeo de YouTube')
+    parser.add_argument('urls', nargs='*', metavar='url',
+                        help='URL del vídeo de YouTube (se admiten varias, que se procesan en lote)')
+    parser.add_argument('--archivo-urls', type=Path, metavar='ARCHIVO',
+                        help='Archivo con una URL de YouTube por línea para procesarlas en lote '
+                             '(- para leerlas de la entrada estándar)')
+    parser.add_argument('--concurrencia', type=int, default=CONCURRENCIA_VIDEOS,
+                        help=f'Vídeos procesados a la vez con varias URLs (default: {CONCURRENCIA_VIDEOS})')
+    parser.add_argument('--max-generaciones', type=int, default=4, metavar='N',
+                        help='Artefactos generándose a la vez, sumando todos los vídeos (default: 4)')
     parser.add_argument('--mostrar-informe', action='store_true',
                         help='Muestra el contenido del informe por pantalla')
     parser.add_argument('--mostrar-descripcion', action='store_true',
@@ -372,6 +680,8 @@ Por defecto solo genera el informe (sin límite). Use --todo para todos.
                         help='Segundos máx. para esperar procesamiento de fuente (default: 60)')
     parser.add_argument('--retardo', type=float, default=3.0,
                         help='Segundos de retardo entre inicio de cada generación (default: 3)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usar la caché en disco de metadatos del vídeo')
     parser.add_argument('--debug', action='store_true',
                         help='Activa el modo debug con trazas detalladas')
 
@@ -404,13 +714,25 @@ Por defecto solo genera el informe (sin límite). Use --todo para todos.
 
     args = parser.parse_args()
 
+    # URLs a procesar: la de la línea de comandos y/o las del archivo
+    urls = list(args.urls)
+    if args.archivo_urls:
+        try:
+            urls += leer_archivo_urls(args.archivo_urls)
+        except OSError as e:
+            parser.error(f"no se pudo leer {args.archivo_urls}: {e}")
+    # Sin duplicados, conservando el orden
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        parser.error("indica la URL de un vídeo o un --archivo-urls con URLs")
+
     print(f"NotebookLM YouTube Importer v{VERSION}")
 
     # Activar modo debug si se solicita
     if args.debug:
         set_debug(True)
         debug("Modo DEBUG activado")
-        debug(f"Argumentos: url={args.url}, mostrar_informe={args.mostrar_informe}, "
+        debug(f"Argumentos: urls={urls}, mostrar_informe={args.mostrar_informe}, "
               f"idioma={args.idioma}, timeout_fuente={args.timeout_fuente}, retardo={args.retardo}, "
               f"mostrar_descripcion={args.mostrar_descripcion}, todo={args.todo}")
 
@@ -419,55 +741,51 @@ Por defecto solo genera el informe (sin límite). Use --todo para todos.
         print("Nota: Usando idioma español por defecto. Usa --idioma para cambiar (ej: --idioma en)")
 
     # Determinar qué artefactos generar
-    artefactos_solicitados = set()
     if args.todo:
         artefactos_solicitados = set(TIPOS_ARTEFACTOS.keys())
     else:
-        if args.report:
-            artefactos_solicitados.add('report')
-        if args.mind_map:
-            artefactos_solicitados.add('mind_map')
-        if args.data_table:
-            artefactos_solicitados.add('data_table')
-        if args.slides:
-            artefactos_solicitados.add('slides')
-        if args.infographic:
-            artefactos_solicitados.add('infographic')
-        if args.quiz:
-            artefactos_solicitados.add('quiz')
-        if args.flashcards:
-            artefactos_solicitados.add('flashcards')
-        if args.audio:
-            artefactos_solicitados.add('audio')
-        if args.video:
-            artefactos_solicitados.add('video')
+        # Cada opción --mind-map, --data-table... se guarda con el nombre de su tipo
+        artefactos_solicitados = {t for t in TIPOS_ARTEFACTOS if getattr(args, t)}
 
         # Si no se especificó ninguno, usar conjunto por defecto
         if not artefactos_solicitados:
             artefactos_solicitados = {'report', 'mind_map', 'data_table', 'quiz', 'flashcards'}
             print("Nota: Generando artefactos por defecto (informe, mapa mental, tabla, cuestionario, tarjetas). Usa --todo para todos.")
 
+    # Ordenar una sola vez según ORDEN_ARTEFACTOS; todos los vídeos del lote reutilizan la tupla
+    artefactos_solicitados = tuple(t for t in ORDEN_ARTEFACTOS if t in artefactos_solicitados)
+
+    # Un único límite de generaciones simultáneas para todos los vídeos
+    limitar_generaciones(max(1, args.max_generaciones))
+
     # Mostrar qué se va a generar
-    sin_limite = [t for t in artefactos_solicitados if not TIPOS_ARTEFACTOS[t][1]]
-    con_limite = [t for t in artefactos_solicitados if TIPOS_ARTEFACTOS[t][1]]
+    sin_limite, con_limite = [], []
+    for tipo in artefactos_solicitados:
+        (con_limite if TIPOS_ARTEFACTOS[tipo][1] else sin_limite).append(tipo)
     if sin_limite:
         print(f"Artefactos sin límite: {', '.join(sin_limite)}")
     if con_limite:
         print(f"Artefactos con límite: {', '.join(con_limite)} (pueden fallar si se alcanzó el límite diario)")
 
     try:
-        asyncio.run(procesar_video(
-            args.url,
+        opciones = (
             args.mostrar_informe,
             args.idioma,
             args.timeout_fuente,
             args.retardo,
             args.mostrar_descripcion,
-            artefactos_solicitados
-        ))
+            artefactos_solicitados,
+        )
+        if len(urls) == 1:
+            asyncio.run(procesar_video(urls[0], *opciones, usar_cache=not args.no_cache))
+        else:
+            print(f"Procesando {len(urls)} vídeos (concurrencia: {max(1, args.concurrencia)})")
+            resultados = asyncio.run(procesar_videos(urls, *opciones, concurrencia=max(1, args.concurrencia),
+                                                     usar_cache=not args.no_cache))
+            print(f"\nLote completado: {sum(resultados)}/{len(urls)} vídeos procesados correctamente")
     except Exception as e:
         print(f"\nError: {e}")
-        debug(f"Excepción en main: {type(e).__name__}: {e}")
+        debug("Excepción en main: %s: %s", type(e).__name__, e)
         print("\n¿Has ejecutado 'notebooklm login' para autenticarte?")
         sys.exit(1)
 
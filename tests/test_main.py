@@ -0,0 +1,115 @@
+import pytest
+import yt_dlp
+
+import common
+import main
+
+
+class YoutubeDLFalso:
+    """Sustituto de yt_dlp.YoutubeDL que imita la extracción sin procesado de YouTube"""
+
+    llamadas = []
+
+    def __init__(self, opciones):
+        self.opciones = opciones
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def extract_info(self, url, download=False, process=True, ie_key=None):
+        YoutubeDLFalso.llamadas.append((url, process, ie_key))
+        if 'list=' in url and not process:
+            # YoutubeTab con noplaylist: solo un enlace al vídeo, sin metadatos
+            return {'_type': 'url', 'url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                    'ie_key': 'Youtube', 'title': None}
+        return {'id': 'dQw4w9WgXcQ', 'title': 'Never Gonna Give You Up', 'channel': 'Rick Astley',
+                'upload_date': '20091025', 'description': 'Vídeo oficial'}
+
+
+@pytest.fixture
+def ytdlp_falso(monkeypatch, tmp_path):
+    monkeypatch.setattr(yt_dlp, 'YoutubeDL', YoutubeDLFalso)
+    monkeypatch.setattr(common, 'DIRECTORIO_CACHE', tmp_path)
+    monkeypatch.delenv('YT_API_KEY', raising=False)
+    main._extraer_metadatos_ytdlp.cache_clear()
+    YoutubeDLFalso.llamadas = []
+    yield YoutubeDLFalso
+    main._extraer_metadatos_ytdlp.cache_clear()
+
+
+class TestObtenerMetadatosVideo:
+    """Tests para la funcion obtener_metadatos_video"""
+
+    def test_url_con_lista_resuelve_el_video(self, ytdlp_falso):
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI"
+        metadatos = main.obtener_metadatos_video(url, usar_cache=False)
+        assert metadatos['titulo'] == 'Never Gonna Give You Up'
+        assert metadatos['canal'] == 'Rick Astley'
+        assert metadatos['fecha'] == '2009-10-25'
+        assert metadatos['video_id'] == 'dQw4w9WgXcQ'
+        # El enlace se resuelve con el extractor de vídeo, sin procesado completo
+        assert ytdlp_falso.llamadas[1] == ('https://www.youtube.com/watch?v=dQw4w9WgXcQ', False, 'Youtube')
+
+    def test_url_con_lista_pide_solo_el_video(self, ytdlp_falso, monkeypatch):
+        opciones = []
+        monkeypatch.setattr(ytdlp_falso, '__init__', lambda self, o: opciones.append(o))
+        main.obtener_metadatos_video("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123", usar_cache=False)
+        assert opciones[0]['noplaylist'] is True
+
+    def test_no_guarda_en_cache_metadatos_incompletos(self, ytdlp_falso, monkeypatch, tmp_path):
+        monkeypatch.setattr(ytdlp_falso, 'extract_info',
+                            lambda self, url, download=False, process=True, ie_key=None: {'id': 'dQw4w9WgXcQ'})
+        metadatos = main.obtener_metadatos_video("https://youtu.be/dQw4w9WgXcQ")
+        assert metadatos['titulo'] == 'Sin título'
+        assert not (tmp_path / 'metadatos_dQw4w9WgXcQ.json').exists()
+
+    def test_guarda_en_cache_metadatos_completos(self, ytdlp_falso, tmp_path):
+        main.obtener_metadatos_video("https://youtu.be/dQw4w9WgXcQ")
+        assert (tmp_path / 'metadatos_dQw4w9WgXcQ.json').exists()
+
+
+def _extraer_video_id_urlparse(url):
+    """Implementación original con urlparse, referencia para la regex actual"""
+    from urllib.parse import parse_qs, urlparse
+    parsed = urlparse(url)
+    if parsed.hostname in ('www.youtube.com', 'youtube.com'):
+        if parsed.path == '/watch':
+            return parse_qs(parsed.query).get('v', [None])[0]
+        elif parsed.path.startswith('/embed/'):
+            return parsed.path.split('/')[2]
+    elif parsed.hostname == 'youtu.be':
+        return parsed.path[1:]
+    return None
+
+
+class TestExtraerVideoId:
+    """Tests para la funcion extraer_video_id"""
+
+    @pytest.mark.parametrize("url", [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://youtube.com/watch?v=dQw4w9WgXcQ",
+        "http://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=60",
+        "https://www.youtube.com/watch?t=60&v=dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123",
+        "https://www.youtube.com/embed/dQw4w9WgXcQ",
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://WWW.YouTube.com/watch?v=dQw4w9WgXcQ",
+        "HTTPS://YOUTU.BE/dQw4w9WgXcQ",
+        "https://vimeo.com/123456",
+    ])
+    def test_equivale_a_urlparse(self, url):
+        assert main.extraer_video_id(url) == _extraer_video_id_urlparse(url)
+
+    def test_host_en_mayusculas(self):
+        assert main.extraer_video_id("https://WWW.YouTube.com/watch?v=dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+
+    def test_id_distingue_mayusculas(self):
+        assert main.extraer_video_id("https://youtu.be/DQW4W9WGXCQ") == "DQW4W9WGXCQ"
+
+    def test_url_invalida(self):
+        assert main.extraer_video_id("https://vimeo.com/123456") is None
+        assert main.extraer_video_id("") is None
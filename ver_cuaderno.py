@@ -53,6 +53,7 @@ from common import (
     mostrar_informe,
     mostrar_estado_artefactos,
     console,
+    cliente_compartido,
 )
 
 # Versión del programa
@@ -68,12 +69,12 @@ def extraer_notebook_id(entrada: str) -> str:
 
 async def obtener_cuaderno(client: NotebookLMClient, notebook_id: str):
     """Obtiene un cuaderno por su ID buscando en la lista de cuadernos."""
-    debug(f"Buscando cuaderno con ID: {notebook_id}")
+    debug("Buscando cuaderno con ID: %s", notebook_id)
     notebooks = await client.notebooks.list()
-    debug(f"Cuadernos encontrados: {len(notebooks)}")
+    debug("Cuadernos encontrados: %d", len(notebooks))
     for nb in notebooks:
         if nb.id == notebook_id:
-            debug(f"  ✓ Cuaderno encontrado: {nb.title}")
+            debug("  ✓ Cuaderno encontrado: %s", nb.title)
             return nb
     debug("  No se encontró el cuaderno")
     return None
@@ -93,17 +94,17 @@ async def procesar_cuaderno(notebook_id: str, mostrar_informe_flag: bool = False
     """
     debug("="*60)
     debug("INICIO procesar_cuaderno()")
-    debug(f"  notebook_id: {notebook_id}")
-    debug(f"  mostrar_informe: {mostrar_informe_flag}")
-    debug(f"  idioma: {idioma}")
-    debug(f"  retardo: {retardo}s")
-    debug(f"  artefactos_solicitados: {artefactos_solicitados}")
+    debug("  notebook_id: %s", notebook_id)
+    debug("  mostrar_informe: %s", mostrar_informe_flag)
+    debug("  idioma: %s", idioma)
+    debug("  retardo: %ss", retardo)
+    debug("  artefactos_solicitados: %s", artefactos_solicitados)
     debug("="*60)
 
     # 1. Conectar con NotebookLM
     debug("PASO 1: Conectar con NotebookLM")
     console.print("Conectando con NotebookLM...")
-    async with await NotebookLMClient.from_storage() as client:
+    async with cliente_compartido() as client:
         debug("  Conexión establecida con NotebookLM")
 
         # 2. Obtener el cuaderno
@@ -155,7 +156,7 @@ async def procesar_cuaderno(notebook_id: str, mostrar_informe_flag: bool = False
             print(f"  python ver_cuaderno.py \"{notebook_id}\" {' '.join(opciones)}")
 
         # 8. Mostrar informe si se solicita
-        if mostrar_informe_flag and len(existentes['report']) > 0:
+        if mostrar_informe_flag and existentes.report:
             await mostrar_informe(client, notebook.id)
 
         print("\n" + "="*50)
@@ -227,7 +228,7 @@ Sin flags de artefactos, solo muestra el estado actual del cuaderno.
 
     # Extraer notebook_id
     notebook_id = extraer_notebook_id(args.notebook)
-    debug(f"Entrada: {args.notebook} → notebook_id: {notebook_id}")
+    debug("Entrada: %s → notebook_id: %s", args.notebook, notebook_id)
 
     # Mostrar recordatorio de idioma por defecto
     if args.idioma == 'es':
@@ -238,25 +239,8 @@ Sin flags de artefactos, solo muestra el estado actual del cuaderno.
     if args.todo:
         artefactos_solicitados = set(TIPOS_ARTEFACTOS.keys())
     else:
-        solicitados = set()
-        if args.report:
-            solicitados.add('report')
-        if args.mind_map:
-            solicitados.add('mind_map')
-        if args.data_table:
-            solicitados.add('data_table')
-        if args.slides:
-            solicitados.add('slides')
-        if args.infographic:
-            solicitados.add('infographic')
-        if args.quiz:
-            solicitados.add('quiz')
-        if args.flashcards:
-            solicitados.add('flashcards')
-        if args.audio:
-            solicitados.add('audio')
-        if args.video:
-            solicitados.add('video')
+        # Cada opción --mind-map, --data-table... se guarda con el nombre de su tipo
+        solicitados = {t for t in TIPOS_ARTEFACTOS if getattr(args, t)}
         if solicitados:
             artefactos_solicitados = solicitados
 
@@ -281,7 +265,7 @@ Sin flags de artefactos, solo muestra el estado actual del cuaderno.
         ))
     except Exception as e:
         console.print(f"\n[bold red]Error: {e}[/bold red]")
-        debug(f"Excepción en main: {type(e).__name__}: {e}")
+        debug("Excepción en main: %s: %s", type(e).__name__, e)
         console.print("\n¿Has ejecutado 'notebooklm login' para autenticarte?")
         sys.exit(1)
 